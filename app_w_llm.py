@@ -1,12 +1,12 @@
 import streamlit as st
 import pandas as pd
 from data_retrieval_enhanced import EnhancedFDARetriever
-from config import SAMPLE_SIZE_OPTIONS, DATE_RANGE_OPTIONS, DEFAULT_SAMPLE_SIZE, DEFAULT_DATE_MONTHS
+from config import SAMPLE_SIZE_OPTIONS, DATE_RANGE_OPTIONS, DEFAULT_SAMPLE_SIZE, DEFAULT_DATE_MONTHS, CACHE_TTL, CACHE_MAX_ENTRIES
 import os
 import json
-from llm_utils import display_section_with_ai_summary, run_llm_analysis
+from llm_utils import display_section_with_ai_summary, run_llm_analysis, run_section_analyses, record_section_summaries, date_bounds
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
 def cached_get_fda_data(query, query_type, limit=20, date_months=6):
     """Enhanced cached wrapper for FDA data retrieval"""
     
@@ -25,8 +25,9 @@ def cached_get_fda_data(query, query_type, limit=20, date_months=6):
     # Map enhanced data to both views (since enhanced data is comprehensive)
     for source, df in enhanced_data.items():
         if not df.empty:
-            # Limit to requested sample size
+            # Limit to requested sample size, keeping full-source stats for the LLM prompt
             sampled_df = df.head(limit)
+            sampled_df.attrs.update(total_records=len(df), date_bounds=date_bounds(df))
             
             # Add to both device and manufacturer views 
             # (enhanced data is comprehensive enough for both)
@@ -71,22 +72,27 @@ def determine_query_type(query):
 
 def display_device_view(results, query, show_raw_data=False):
     st.session_state.section_results = {}
+    st.session_state.section_first_sentences = {}
 
     if not results:
         st.write("No recent device-related data found.")
         return
 
+    with st.spinner("Analyzing FDA data..."):
+        summaries = run_section_analyses(results, query, "device")
+    record_section_summaries(summaries)
+
     row1_col1, row1_col2 = st.columns(2)
     with row1_col1:
   
         if "RECALL" in results:
-            display_section_with_ai_summary("🚨 Recent Recalls", results["RECALL"], "RECALL", query, "device", show_raw_data)
+            display_section_with_ai_summary("🚨 Recent Recalls", results["RECALL"], "RECALL", query, "device", show_raw_data, summaries.get("RECALL"))
         else:
             st.subheader("🚨 Recent Recalls")
             st.info("No recent recall data found.")
     with row1_col2:
         if "EVENT" in results:
-            display_section_with_ai_summary("⚠️ Recent Adverse Events", results["EVENT"], "EVENT", query, "device", show_raw_data)
+            display_section_with_ai_summary("⚠️ Recent Adverse Events", results["EVENT"], "EVENT", query, "device", show_raw_data, summaries.get("EVENT"))
         else:
             st.subheader("⚠️ Recent Adverse Events")
             st.info("No recent adverse event data found.")
@@ -94,13 +100,13 @@ def display_device_view(results, query, show_raw_data=False):
     row2_col1, row2_col2 = st.columns(2)
     with row2_col1:
         if "PMA" in results:
-            display_section_with_ai_summary("📄 Recent PMA Submissions", results["PMA"], "PMA", query, "device", show_raw_data)
+            display_section_with_ai_summary("📄 Recent PMA Submissions", results["PMA"], "PMA", query, "device", show_raw_data, summaries.get("PMA"))
         else:
             st.subheader("📄 Recent PMA Submissions")
             st.info("No recent PMA submission data found.")
     with row2_col2:
         if "510K" in results:
-            display_section_with_ai_summary("📄 Latest 510(k) Submissions", results["510K"], "510K", query, "device", show_raw_data)
+            display_section_with_ai_summary("📄 Latest 510(k) Submissions", results["510K"], "510K", query, "device", show_raw_data, summaries.get("510K"))
         else:
             st.subheader("📄 Latest 510(k) Submissions")
             st.info("No recent 510(k) submission data found.")
@@ -108,13 +114,13 @@ def display_device_view(results, query, show_raw_data=False):
     row3_col1, row3_col2 = st.columns(2)
     with row3_col1:
         if "UDI" in results:
-            display_section_with_ai_summary("🔗 UDI Database Entries", results["UDI"], "UDI", query, "device", show_raw_data)
+            display_section_with_ai_summary("🔗 UDI Database Entries", results["UDI"], "UDI", query, "device", show_raw_data, summaries.get("UDI"))
         else:
             st.subheader("🔗 UDI Database Entries")
             st.info("No UDI database entries found.")
     with row3_col2:
         if "CLASSIFICATION" in results:
-            display_section_with_ai_summary("🧪 Regulatory Classification", results["CLASSIFICATION"], "CLASSIFICATION", query, "device", show_raw_data)
+            display_section_with_ai_summary("🧪 Regulatory Classification", results["CLASSIFICATION"], "CLASSIFICATION", query, "device", show_raw_data, summaries.get("CLASSIFICATION"))
         else:
             st.subheader("🧪 Regulatory Classification")
             st.info("No classification data found.")
@@ -126,23 +132,29 @@ def display_manufacturer_view(results, query, show_raw_data=False):
     
     # Clear previous section results at the beginning of a new search
     st.session_state.section_results = {}
+    st.session_state.section_first_sentences = {}
     
     if not results:
         st.write("No recent manufacturer-related data found.")
         return
+
+    # Analyze context-free sections concurrently up front; the remaining sections stream in as they render
+    with st.spinner("Analyzing FDA data..."):
+        summaries = run_section_analyses(results, query, "manufacturer")
+    record_section_summaries(summaries)
     
     # Row 1: Recalls and Events
     row1_col1, row1_col2 = st.columns(2)
     with row1_col1:
         if "RECALL" in results:
-            display_section_with_ai_summary("🚨 Recent Recalls", results["RECALL"], "RECALL", query, "manufacturer", show_raw_data)
+            display_section_with_ai_summary("🚨 Recent Recalls", results["RECALL"], "RECALL", query, "manufacturer", show_raw_data, summaries.get("RECALL"))
         else:
             st.subheader("🚨 Recent Recalls")
             st.info("No recent recall data found.")
     
     with row1_col2:
         if "EVENT" in results:
-            display_section_with_ai_summary("⚠️ Recent Adverse Events", results["EVENT"], "EVENT", query, "manufacturer", show_raw_data)
+            display_section_with_ai_summary("⚠️ Recent Adverse Events", results["EVENT"], "EVENT", query, "manufacturer", show_raw_data, summaries.get("EVENT"))
         else:
             st.subheader("⚠️ Recent Adverse Events")
             st.info("No recent adverse event data found.")
@@ -151,14 +163,14 @@ def display_manufacturer_view(results, query, show_raw_data=False):
     row2_col1, row2_col2 = st.columns(2)
     with row2_col1:
         if "PMA" in results:
-            display_section_with_ai_summary("📄 Recent PMA Submissions", results["PMA"], "PMA", query, "manufacturer", show_raw_data)
+            display_section_with_ai_summary("📄 Recent PMA Submissions", results["PMA"], "PMA", query, "manufacturer", show_raw_data, summaries.get("PMA"))
         else:
             st.subheader("📄 Recent PMA Submissions")
             st.info("No recent PMA submission data found.")
     
     with row2_col2:
         if "510K" in results:
-            display_section_with_ai_summary("📄 Latest 510(k) Submissions", results["510K"], "510K", query, "manufacturer", show_raw_data)
+            display_section_with_ai_summary("📄 Latest 510(k) Submissions", results["510K"], "510K", query, "manufacturer", show_raw_data, summaries.get("510K"))
         else:
             st.subheader("📄 Latest 510(k) Submissions")
             st.info("No recent 510(k) submission data found.")
@@ -167,23 +179,31 @@ def display_manufacturer_view(results, query, show_raw_data=False):
     row3_col1, row3_col2 = st.columns(2)
     with row3_col1:
         if "UDI" in results:
-            display_section_with_ai_summary("🔗 UDI Database Entries", results["UDI"], "UDI", query, "manufacturer", show_raw_data)
+            display_section_with_ai_summary("🔗 UDI Database Entries", results["UDI"], "UDI", query, "manufacturer", show_raw_data, summaries.get("UDI"))
         else:
             st.subheader("🔗 UDI Database Entries")
             st.info("No UDI database entries found.")
     
     with row3_col2:
         if "CLASSIFICATION" in results:
-            display_section_with_ai_summary("🧪 Regulatory Classification", results["CLASSIFICATION"], "CLASSIFICATION", query, "manufacturer", show_raw_data)
+            display_section_with_ai_summary("🧪 Regulatory Classification", results["CLASSIFICATION"], "CLASSIFICATION", query, "manufacturer", show_raw_data, summaries.get("CLASSIFICATION"))
         else:
             st.subheader("🧪 Regulatory Classification")
             st.info("No classification data found.")
 
+@st.cache_data(show_spinner=False)
+def load_about_content():
+    """Read about.md once per process instead of on every rerun"""
+    if not os.path.exists("about.md"):
+        return None
+    with open("about.md", "r") as f:
+        return f.read()
+
 def add_about_button():
     """Add an About button that shows the content of about.md in a modal when clicked"""
-    if os.path.exists("about.md"):
-        with open("about.md", "r") as f:
-            about_content = f.read()
+    about_content = load_about_content()
+    if about_content is None:
+        return
     with st.expander("About FDA Medical Device Intelligence Demo", expanded=False):
         st.markdown(about_content)
 
@@ -246,17 +266,25 @@ def main():
         """)
 
         with st.expander("🔍 Developer Information"):
-            for view, tables in results.items():
-                if view == query_type:
-                    st.write(f"**{view.upper()} VIEW DATA**")
-                    for source, df in tables.items():
-                        st.write(f"- {source}: {len(df)} records, {len(df.columns)} fields")
-                        if not df.empty:
-                            date_col = next((col for col in ["date_received", "decision_date", "event_date_initiated"] if col in df.columns), None)
-                            if date_col:
-                                min_date = pd.to_datetime(df[date_col]).min().strftime('%Y-%m-%d')
-                                max_date = pd.to_datetime(df[date_col]).max().strftime('%Y-%m-%d')
-                                st.write(f"  Date range: {min_date} to {max_date}")
+            # Assemble one markdown block so the panel is a single element instead of one per line
+            tables = results.get(query_type, {})
+            displayed = sum(len(df) for df in tables.values())
+            # Full-source counts ride along on each sampled frame from cached_get_fda_data
+            retrieved = sum(df.attrs.get("total_records", len(df)) for df in tables.values())
+            blocks = [f"**Total records displayed:** {displayed} (of {retrieved} retrieved)"]
+            if query_type in results:
+                blocks.append(f"**{query_type.upper()} VIEW DATA**")
+                items = []
+                for source, df in results[query_type].items():
+                    item = f"- {source}: {len(df)} records, {len(df.columns)} fields"
+                    if not df.empty:
+                        min_date, max_date = date_bounds(df)
+                        if min_date != "N/A":
+                            item += f"  \n  Date range: {min_date} to {max_date}"
+                    items.append(item)
+                if items:
+                    blocks.append("\n".join(items))
+            st.markdown("\n\n".join(blocks))
 
 if __name__ == "__main__":
     try:
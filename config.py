@@ -1,5 +1,15 @@
 QUERY_LIMIT = 100
 CACHE_TTL = 3600
+CACHE_MAX_ENTRIES = 128
+
+LLM_CACHE_PATH = ".cache/llm_responses.sqlite"
+LLM_CACHE_TTL = 7 * 24 * 3600
+LLM_MEMORY_CACHE_TTL = 3600
+# Free models first; set False to route RECALL/EVENT analyses to paid models first
+LLM_PREFER_FREE_MODELS = True
+
+FDA_CACHE_PATH = ".cache/fda_responses.sqlite"
+FDA_CACHE_TTL = 24 * 3600
 
 DISPLAY_COLUMNS = {
     "510K": ["k_number", "device_name", "decision_date", "decision_description", "applicant", "product_code", "clearance_type"],
@@ -15,6 +25,8 @@ DISPLAY_COLUMNS = {
     ]
 }
 
+RAW_DATA_PREVIEW_ROWS = 100
+
 DEFAULT_SAMPLE_SIZE = 20
 DEFAULT_DATE_MONTHS = 6
 SAMPLE_SIZE_OPTIONS = [20, 50, 100]
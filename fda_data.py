@@ -1,9 +1,21 @@
 # fda_data.py
 import requests
 import pandas as pd
+import json
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List, Dict
 from datetime import datetime, timedelta
+from config import FDA_CACHE_PATH, FDA_CACHE_TTL
+from response_cache import ResponseCache, make_cache_key
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Constants (no changes needed)
 FDA_ENDPOINTS = {
@@ -15,6 +27,16 @@ FDA_ENDPOINTS = {
     "udi": "https://api.fda.gov/device/udi.json"
 }
 
+DATE_FIELDS = {
+    "RECALL": "event_date_initiated",
+    "EVENT": "date_received",
+    "PMA": "decision_date",
+    "510K": "decision_date"
+}
+
+MAX_CONCURRENT_SEARCHES = 6
+REQUEST_TIMEOUT = (3.05, 30)  # (connect, read) seconds
+
 SEARCH_FIELDS = {
     "device": {
         "510k": ["device_name"],
@@ -53,12 +75,38 @@ def setup_logging():
     logging.basicConfig(level=logging.INFO,
                         format='%(asctime)s - %(levelname)s - %(message)s')
 
-def fetch_data(url: str, params: Dict) -> Dict | None:
-    """Fetch data from the given URL with the specified parameters."""
+def _create_session() -> requests.Session:
+    """Pooled keep-alive session so searches reuse TLS connections to api.fda.gov."""
+    retry = Retry(total=2, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONCURRENT_SEARCHES, max_retries=retry))
+    return session
+
+_session = _create_session()
+_response_cache = ResponseCache(FDA_CACHE_PATH, FDA_CACHE_TTL)
+
+def _loads(payload):
+    """Decode a JSON body; orjson parses the large nested result pages several times faster."""
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+def fetch_data(url: str, params: Dict, use_cache: bool | None = None) -> Dict | None:
+    """Fetch data from the given URL with the specified parameters.
+
+    Successful responses are kept in the on-disk cache, so repeat searches (also across
+    restarts) skip the network; pass use_cache=False or set CACHE=off to force fresh responses.
+    """
+    if use_cache is None:
+        use_cache = os.getenv("CACHE", "on").lower() != "off"
+    key = make_cache_key("fda_data:v1", url, json.dumps(params, sort_keys=True))
+    if use_cache:
+        cached = _response_cache.get(key)
+        if cached is not None:
+            return _loads(cached)
+
     try:
-        response = requests.get(url, params=params, timeout=30)
+        response = _session.get(url, params=params, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        return response.json()
+        data = _loads(response.content)
     except requests.exceptions.Timeout:
         logging.error(f"Request to {url} timed out")
         return None
@@ -69,19 +117,18 @@ def fetch_data(url: str, params: Dict) -> Dict | None:
         logging.error(f"Invalid JSON response from {url}: {e}")
         return None
 
+    if use_cache:
+        _response_cache.set(key, response.text)
+    return data
+
 def process_results(data: Dict, source: str) -> pd.DataFrame:
     """Process the API results and return a DataFrame."""
 
     if not data or 'results' not in data:
         return pd.DataFrame()
 
+    # json_normalize already flattens the openfda block into openfda.* columns
     df = pd.json_normalize(data['results'], sep='.')
-    if source.lower() != "event" and 'results' in data:
-        for i, row in enumerate(data['results']):
-            if 'openfda' in row:
-                for key in ['device_class', 'regulation_number', 'medical_specialty_description']:
-                    if key in row['openfda']:
-                        df.at[i, f'openfda.{key}'] = row['openfda'][key]
 
     if source.upper() == "EVENT":
         df = process_event_data(df, data['results'])
@@ -91,28 +138,34 @@ def process_results(data: Dict, source: str) -> pd.DataFrame:
 
 def process_event_data(df: pd.DataFrame, results: List[Dict]) -> pd.DataFrame:
     """Process the nested event data structure."""
+    # Build each derived column as a plain list, then assign all columns at once
+    device_fields = ['brand_name', 'generic_name', 'device_report_product_code']
+    columns = {f'device.{field}': [None] * len(results) for field in device_fields}
+    columns['patient.outcome'] = [None] * len(results)
+    columns['remedial_action'] = [None] * len(results)
 
-    for result_idx, result in enumerate(results):
+    for idx, result in enumerate(results):
         # Extract device data
-        if 'device' in result and result['device']:
-            for device_field in ['brand_name', 'generic_name', 'device_report_product_code']:
-                if device_field in result['device'][0]:
-                    df.at[result_idx, f'device.{device_field}'] = result['device'][0][device_field]
-        if 'openfda' in result:
-            for key in ['device_class', 'regulation_number', 'medical_specialty_description']:
-                if key in result['openfda']:
-                    df.at[result_idx, f'openfda.{key}'] = result['openfda'][key]
-
+        if result.get('device'):
+            device = result['device'][0]
+            for field in device_fields:
+                if field in device:
+                    columns[f'device.{field}'][idx] = device[field]
 
         # Extract patient outcome
-        if 'patient' in result and result['patient'] and len(result['patient']) > 0:
-            if 'sequence_number_outcome' in result['patient'][0] and result['patient'][0]['sequence_number_outcome']:
-                df.at[result_idx, 'patient.outcome'] = result['patient'][0]['sequence_number_outcome'][0]
+        patients = result.get('patient')
+        if patients and patients[0].get('sequence_number_outcome'):
+            columns['patient.outcome'][idx] = patients[0]['sequence_number_outcome'][0]
 
         # Extract remedial action
-        if 'remedial_action' in result and result['remedial_action'] and len(result['remedial_action']) > 0:
-            df.at[result_idx, 'remedial_action'] = result['remedial_action'][0]
-    return df
+        if result.get('remedial_action'):
+            columns['remedial_action'][idx] = result['remedial_action'][0]
+
+    # Reports without a value keep whatever json_normalize produced, as before
+    for name, values in columns.items():
+        built = pd.Series(values, index=df.index, dtype=object)
+        columns[name] = built.combine_first(df[name]) if name in df.columns else built
+    return df.assign(**columns)
 
 def add_missing_columns(df: pd.DataFrame, source: str) -> pd.DataFrame:
     """Ensure all expected columns exist in the dataframe."""
@@ -123,7 +176,7 @@ def add_missing_columns(df: pd.DataFrame, source: str) -> pd.DataFrame:
             df[col] = None
     return df
 
-def search_fda(query: str, category: str, source: str, limit: int = 100) -> pd.DataFrame:
+def search_fda(query: str, category: str, source: str, limit: int = 100, use_cache: bool | None = None) -> pd.DataFrame:
     """Search FDA database for a specific category and source."""
 
     results_df = pd.DataFrame()
@@ -150,7 +203,7 @@ def search_fda(query: str, category: str, source: str, limit: int = 100) -> pd.D
         if date_field:
             params["sort"] = f"{date_field}:desc"
 
-    data = fetch_data(url, params)
+    data = fetch_data(url, params, use_cache)
     if data:
         df = process_results(data, source)
         if not df.empty:
@@ -159,24 +212,21 @@ def search_fda(query: str, category: str, source: str, limit: int = 100) -> pd.D
         logging.warning(f"No results found for {source.upper()} with fields {search_fields} and query '{query}'")
     return results_df
 
+def _recent_mask(df: pd.DataFrame, source: str, months: int) -> pd.Series | None:
+    """Boolean mask of records from the last N months, or None if the source has no date field."""
+    date_field = DATE_FIELDS.get(source.upper())
+    if not date_field or date_field not in df.columns:
+        return None
+    cutoff_date = datetime.now() - timedelta(days=months * 30)
+    df[date_field] = pd.to_datetime(df[date_field], errors='coerce')
+    return df[date_field] >= cutoff_date
+
 def filter_by_date(df: pd.DataFrame, source: str, months: int = 6) -> pd.DataFrame:
     """Filter DataFrame to include only records from the last N months."""
-    date_field = None
-    if source.upper() == 'RECALL':
-        date_field = 'event_date_initiated'
-    elif source.upper() == 'EVENT':
-        date_field = 'date_received'
-    elif source.upper() == 'PMA' or source.upper() == '510K':
-        date_field = 'decision_date'
-
-    if date_field and date_field in df.columns:
-        cutoff_date = datetime.now() - timedelta(days=months * 30)
-        df[date_field] = pd.to_datetime(df[date_field], errors='coerce')
-        df_filtered = df[df[date_field] >= cutoff_date]
-        return df_filtered
-    return df
+    mask = _recent_mask(df, source, months)
+    return df if mask is None else df[mask]
 
-def get_fda_data(query: str, query_type: str, limit: int = 100, date_months: int = 6) -> Dict[str, Dict[str, pd.DataFrame]]:
+def get_fda_data(query: str, query_type: str, limit: int = 100, date_months: int = 6, use_cache: bool | None = None) -> Dict[str, Dict[str, pd.DataFrame]]:
     """Main function to get all FDA data for a query.
     Returns a dictionary with device and manufacturer views, filtered by date.
     """
@@ -185,7 +235,7 @@ def get_fda_data(query: str, query_type: str, limit: int = 100, date_months: int
     setup_logging()  # Initialize logging
     fei_numbers = set()
     if query_type == "manufacturer":
-        fei_df = search_fda(query, "manufacturer", "registrationlisting", limit=1000)
+        fei_df = search_fda(query, "manufacturer", "registrationlisting", limit=1000, use_cache=use_cache)
         if "registration.registration_number" in fei_df.columns:
             fei_numbers.update(fei_df["registration.registration_number"].dropna().astype(str).unique())
         if "openfda.fei_number" in fei_df.columns:
@@ -194,16 +244,24 @@ def get_fda_data(query: str, query_type: str, limit: int = 100, date_months: int
     # Determine which categories to search based on query_type
     categories_to_search = [query_type] if query_type in SEARCH_FIELDS else list(SEARCH_FIELDS.keys())
 
-    for category in categories_to_search:
-        for source in SEARCH_FIELDS[category]:
-            df = search_fda(query, category, source, limit)
-            if query_type == "manufacturer" and not df.empty and fei_numbers and "firm_fei_number" in df.columns:
-                df = df[df["firm_fei_number"].astype(str).isin(fei_numbers)]
+    searches = [(category, source) for category in categories_to_search for source in SEARCH_FIELDS[category]]
+    # Each search is an independent round-trip, so issue them together and wait on the slowest
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SEARCHES) as executor:
+        frames = executor.map(lambda search: search_fda(query, search[0], search[1], limit, use_cache), searches)
 
-            if not df.empty:
-                if source.upper() in ["RECALL", "EVENT", "PMA", "510K"]:
-                    df = filter_by_date(df, source, date_months)
-                results[category][source.upper()] = df
+        for (category, source), df in zip(searches, frames):
+            if df.empty:
+                continue
+            # AND the firm and recency conditions into one mask so each frame is sliced once
+            mask = pd.Series(True, index=df.index)
+            if query_type == "manufacturer" and fei_numbers and "firm_fei_number" in df.columns:
+                mask &= df["firm_fei_number"].astype(str).isin(fei_numbers)
+                if not mask.any():
+                    continue
+            recent = _recent_mask(df, source, date_months)
+            if recent is not None:
+                mask &= recent
+            results[category][source.upper()] = df if mask.all() else df[mask]
 
     return results
 
@@ -1,50 +1,98 @@
 import json
+import functools
+import re
+import threading
 import streamlit as st
 import os
 import pandas as pd
-from openrouter_api import OpenRouterAPI
-from config import DISPLAY_COLUMNS
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict
+from openrouter_api import get_shared_api
+from response_cache import ResponseCache, make_cache_key
+from config import DISPLAY_COLUMNS, RAW_DATA_PREVIEW_ROWS, LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_MEMORY_CACHE_TTL, LLM_PREFER_FREE_MODELS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SECTION_ORDER = ["RECALL", "EVENT", "PMA", "510K", "UDI", "CLASSIFICATION"]
+SIMPLE_SOURCES = ("UDI", "CLASSIFICATION")
+COMPLEX_SOURCES = ("RECALL", "EVENT")
+
+_ESSENTIAL_FIELDS = {
+    "510K": ("k_number", "device_name", "decision_date", "applicant"),
+    "PMA": ("pma_number", "trade_name", "decision_date", "applicant"),
+    "CLASSIFICATION": ("device_name", "device_class", "medical_specialty_description"),
+    "UDI": ("brand_name", "device_description", "company_name"),
+    "RECALL": ("event_date_initiated", "recalling_firm", "product_description", "recall_classification", "reason_for_recall"),
+    "EVENT": ("date_received", "manufacturer_name", "product_problems", "device.brand_name", "device.generic_name")
+}
+_SIMPLE_SUMMARY_FIELDS = {
+    "CLASSIFICATION": (("device_name", "Common device types"), ("device_class", "Device classes"), ("medical_specialty_description", "Medical specialties")),
+    "UDI": (("brand_name", "Common brands"), ("company_name", "Companies"), ("device_description", "Device descriptions"))
+}
+_DATE_CANDIDATES = ("date_received", "decision_date", "event_date_initiated")
+_SMALL_SAMPLE_SOURCES = frozenset({"RECALL", "EVENT"})
+
+def date_bounds(df):
+    """Earliest and latest date in the source's primary date column, parsed once."""
+    date_col = next((col for col in _DATE_CANDIDATES if col in df.columns), None)
+    if not date_col:
+        return "N/A", "N/A"
+    dates = df[date_col]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors='coerce')
+    earliest, latest = dates.agg(['min', 'max'])
+    if pd.isna(earliest):
+        return "N/A", "N/A"
+    return earliest.strftime('%Y-%m-%d'), latest.strftime('%Y-%m-%d')
 
 def prepare_data_for_llm(df, source_type):
     if df.empty:
         return {}
 
-    essential_fields = {
-        "510K": ["k_number", "device_name", "decision_date", "applicant"],
-        "PMA": ["pma_number", "trade_name", "decision_date", "applicant"],
-        "CLASSIFICATION": ["device_name", "device_class", "medical_specialty_description"],
-        "UDI": ["brand_name", "device_description", "company_name"],
-        "RECALL": ["event_date_initiated", "recalling_firm", "product_description", "recall_classification", "reason_for_recall"],
-        "EVENT": ["date_received", "manufacturer_name", "product_problems", "device.brand_name", "device.generic_name"]
-    }
+    columns = df.columns
+    fields = _ESSENTIAL_FIELDS.get(source_type, columns)
+    available_fields = [field for field in fields if field in columns]
+    df_sample = df.head(10 if source_type in _SMALL_SAMPLE_SOURCES else 20)[available_fields].copy()
 
-    fields = essential_fields.get(source_type, df.columns.tolist())
-    available_fields = [field for field in fields if field in df.columns]
-    df_sample = df.head(10 if source_type in ["RECALL", "EVENT"] else 20).copy()
-    df_sample = df_sample[available_fields]
+    # Collapse rows that differ only by date so near-duplicate incidents cost one record's tokens
+    duplicate_counts = None
+    dedup_fields = [field for field in available_fields if field not in _DATE_CANDIDATES]
+    if dedup_fields:
+        # Newer pandas keeps missing values missing under astype(str), so blank them first
+        keys = df_sample[dedup_fields].astype(object).fillna('').astype(str).agg('|'.join, axis=1)
+        first_seen = ~keys.duplicated()
+        duplicate_counts = keys.map(keys.value_counts())[first_seen].to_numpy()
+        df_sample = df_sample[first_seen]
 
-    for col in df_sample.columns:
-        if pd.api.types.is_datetime64_any_dtype(df_sample[col]):
-            df_sample[col] = df_sample[col].dt.strftime('%Y-%m-%d')
+    date_cols = df_sample.select_dtypes(include=["datetime", "datetimetz"]).columns
+    if len(date_cols):
+        df_sample[date_cols] = df_sample[date_cols].apply(lambda s: s.dt.strftime('%Y-%m-%d'))
 
-    records = df_sample.to_dict(orient='records')
+    values = df_sample.to_numpy(dtype=object)
+    columns = df_sample.columns.tolist()
+    records = [dict(zip(columns, row)) for row in values]
+    if duplicate_counts is not None:
+        for record, count in zip(records, duplicate_counts):
+            if count > 1:
+                record["duplicate_count"] = int(count)
 
-    date_col = next((col for col in ["date_received", "decision_date", "event_date_initiated"] if col in df.columns), None)
-    earliest = pd.to_datetime(df[date_col]).min().strftime('%Y-%m-%d') if date_col else "N/A"
-    latest = pd.to_datetime(df[date_col]).max().strftime('%Y-%m-%d') if date_col else "N/A"
+    # Full-source stats are precomputed at fetch time when df is already a sample
+    earliest, latest = df.attrs.get("date_bounds") or date_bounds(df)
 
     return {
         "source_type": source_type,
-        "num_total_records_in_source": len(df),
+        "num_total_records_in_source": df.attrs.get("total_records", len(df)),
         "num_sample_records_analyzed": len(records),
         "sample_records": records,
         "approx_date_range_in_source": f"{earliest} to {latest}"
     }
 
-def create_structured_system_prompt(query_type, section_name, is_simple):
-    if is_simple:
-        return f"You are an assistant listing classification or UDI records. Identify common device types, companies, and classifications for this {query_type}."
-    return f"""You are a helpful assistant analyzing FDA data. First verify if the query appears in the data. If not, say: 'No specific data for [query] was found in this data sample.'
+_SIMPLE_SYSTEM_PROMPT = "You are an assistant listing classification or UDI records. Identify common device types, companies, and classifications for this {query_type}."
+
+_STRUCTURED_SYSTEM_PROMPT = """You are a helpful assistant analyzing FDA data. First verify if the query appears in the data. If not, say: 'No specific data for [query] was found in this data sample.'
 
 MAIN OBSERVATION:
 [Key finding]
@@ -58,92 +106,273 @@ OTHER DETAILS:
 IMPORTANT NOTE:
 This is based only on a small sample of recent records."""
 
-def generate_llm_prompt(data_json, source_type, query, query_type, is_simple, section_results=None):
-    prompt = f"""Analyze the following sample related to '{query}' ({source_type} - {query_type}):
-Total Records: {data_json['num_total_records_in_source']}
-Analyzed: {data_json['num_sample_records_analyzed']}
-Date Range: {data_json['approx_date_range_in_source']}
+@functools.lru_cache(maxsize=32)
+def create_structured_system_prompt(query_type, section_name, is_simple):
+    if is_simple:
+        return _SIMPLE_SYSTEM_PROMPT.format(query_type=query_type)
+    return _STRUCTURED_SYSTEM_PROMPT
+
+def build_messages(system, prompt, context=None):
+    """Static system prompt first, marked cacheable so providers can reuse the prefix across sections.
+
+    Context from earlier sections goes in its own cacheable message between the system prompt
+    and the data, so sections sharing the same context share the same prompt prefix.
+    """
+    messages = [{"role": "system", "content": [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]}]
+    if context:
+        messages.append({"role": "user", "content": [{"type": "text", "text": context, "cache_control": {"type": "ephemeral"}}]})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+def first_sentence(summary):
+    """Context line for a finished section summary, or None when it found nothing to report."""
+    if "No specific" in summary:
+        return None
+    return summary.split('.', 1)[0]
+
+def section_context(first_sentences):
+    """One line per earlier section, in page order, from precomputed first sentences."""
+    if not first_sentences:
+        return None
+    # Listing sections are templated value counts, not findings; they never feed later prompts
+    lines = [f"* {source}: {first_sentences[source]}" for source in SECTION_ORDER
+             if source in first_sentences and source not in SIMPLE_SOURCES]
+    return "Context from earlier sections:\n" + "\n".join(lines) if lines else None
+
+def _dumps_compact(obj):
+    """Compact JSON for prompts: no indentation whitespace to pay for in tokens."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, separators=(',', ':'), default=str)
+
+def generate_llm_prompt(data_json, source_type, query, query_type, is_simple):
+    total = data_json.get('num_total_records_in_source', 0)
+    sample_n = data_json.get('num_sample_records_analyzed', 0)
+    date_range = data_json.get('approx_date_range_in_source', "N/A")
+    sample_records = data_json.get('sample_records', [])
+
+    return f"""Analyze the following sample related to '{query}' ({source_type} - {query_type}):
+Total Records: {total}
+Analyzed: {sample_n}
+Date Range: {date_range}
 
 Sample Records:
-{json.dumps(data_json['sample_records'], indent=2)}"""
+{_dumps_compact(sample_records)}"""
 
-    if section_results and not is_simple:
-        context = "\n".join([f"* {k}: {v.split('.')[0]}" for k, v in section_results.items() if "No specific" not in v])
-        if context:
-            prompt += f"\n\nContext from earlier sections:\n{context}"
-    return prompt
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.RLock()
+_executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="llm")
+_response_cache = ResponseCache(LLM_CACHE_PATH, LLM_CACHE_TTL, memory_ttl=LLM_MEMORY_CACHE_TTL)
 
-def run_llm_analysis(df, source_type, query, query_type="device", custom_prompt=None, section_results=None):
-    try:
-        api = OpenRouterAPI()
+def _generate(key, messages, complexity=None):
+    result = get_shared_api().chat_with_fallback(messages, max_tokens=800, temperature=0.3, preferred_free=LLM_PREFER_FREE_MODELS, complexity=complexity)
+    if result['success']:
+        _response_cache.set(key, result['response'])
+    return result
 
-        is_simple = source_type in ["UDI", "CLASSIFICATION"]
+def _forget_inflight(key, future):
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
 
-        if custom_prompt:
-            prompt = custom_prompt
-        elif df.empty:
-            return f"No data provided for {source_type} analysis."
-        else:
-            data_json = prepare_data_for_llm(df, source_type)
-            if not data_json.get("sample_records"):
-                return f"No specific data found for '{query}' in this section's sample."
+def _coalesced_generate(messages, complexity=None):
+    """Serve repeat prompts from the response cache and share a single in-flight request between identical concurrent prompts."""
+    key = make_cache_key(json.dumps(messages, sort_keys=True))
+    cached = _response_cache.get(key)
+    if cached is not None:
+        return {'success': True, 'response': cached, 'model': 'cache'}
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None:
+            future = _executor.submit(_generate, key, messages, complexity)
+            _inflight[key] = future
+            future.add_done_callback(lambda f: _forget_inflight(key, f))
+    return future.result()
+
+def summarize_simple_section(df, source_type, top_n=5):
+    """Templated listing of the most frequent values, used instead of an LLM call for listing sections."""
+    # Report the full-source total as the LLM prompts do; the counts themselves come from the displayed sample
+    total = df.attrs.get("total_records", len(df))
+    sampled = f" (counted in a sample of {len(df)})" if total > len(df) else ""
+    lines = [f"MAIN OBSERVATION:\nMost common values across {total} {source_type} records{sampled}:"]
+    for col, label in _SIMPLE_SUMMARY_FIELDS.get(source_type, ()):
+        if col not in df.columns:
+            continue
+        counts = df[col].dropna().astype(str).value_counts().head(top_n)
+        if not counts.empty:
+            lines.append(f"**{label}:** " + ", ".join(f"{value} ({count})" for value, count in counts.items()))
+    return "\n".join(lines)
+
+def _analysis_messages(df, source_type, query, query_type, custom_prompt, first_sentences, enable_llm_for_simple=False):
+    """Chat messages for an analysis, or (None, text) when there is nothing to send to the model."""
+    if custom_prompt:
+        return [{"role": "user", "content": custom_prompt}], None
+    if df.empty:
+        return None, f"No data provided for {source_type} analysis."
+
+    is_simple = source_type in SIMPLE_SOURCES
+    if is_simple and not enable_llm_for_simple:
+        return None, summarize_simple_section(df, source_type)
+    data_json = prepare_data_for_llm(df, source_type)
+    if not data_json.get("sample_records"):
+        return None, f"No specific data found for '{query}' in this section's sample."
 
-            system = create_structured_system_prompt(query_type, source_type, is_simple)
-            prompt = f"{system}\n\n{generate_llm_prompt(data_json, source_type, query, query_type, is_simple, section_results)}"
+    system = create_structured_system_prompt(query_type, source_type, is_simple)
+    context = None if is_simple else section_context(first_sentences)
+    return build_messages(system, generate_llm_prompt(data_json, source_type, query, query_type, is_simple), context), None
+
+def _task_complexity(source_type, custom_prompt=None):
+    """Model routing hint: recall and adverse-event analyses are the ones worth a stronger model."""
+    if custom_prompt:
+        return None
+    return 'complex' if source_type in COMPLEX_SOURCES else None
+
+def _unavailable_message(error):
+    if isinstance(error, ValueError) and "API key not found" in str(error):
+        return "AI analysis unavailable: OpenRouter API key not configured. Add OPENROUTER_API_KEY to environment or api_keys.env file."
+    return f"AI analysis unavailable: {str(error)[:100]}..."
+
+def run_llm_analysis(df, source_type, query, query_type="device", custom_prompt=None, first_sentences=None, enable_llm_for_simple=False):
+    try:
+        messages, text = _analysis_messages(df, source_type, query, query_type, custom_prompt, first_sentences, enable_llm_for_simple)
+        if messages is None:
+            return text
+
+        result = _coalesced_generate(messages, _task_complexity(source_type, custom_prompt))
 
-        messages = [{"role": "user", "content": prompt}]
-        result = api.chat_with_fallback(messages, max_tokens=800, temperature=0.3, preferred_free=True)
-        
         if result['success']:
             return result['response'].strip()
         else:
             return f"AI analysis unavailable: {result['error'][:100]}..."
-    except ValueError as e:
-        if "API key not found" in str(e):
-            return "AI analysis unavailable: OpenRouter API key not configured. Add OPENROUTER_API_KEY to environment or api_keys.env file."
-        return f"AI analysis unavailable: {str(e)[:100]}..."
     except Exception as e:
-        return f"AI analysis unavailable: {str(e)[:100]}..."
+        return _unavailable_message(e)
+
+def stream_llm_analysis(df, source_type, query, query_type="device", first_sentences=None, enable_llm_for_simple=False):
+    """Yield the analysis text as the model produces it; cached or shared responses arrive in one piece.
+
+    Streams take part in the same in-flight coalescing as run_llm_analysis: when an identical
+    prompt is already being generated, this waits for that single upstream call instead of
+    starting another.
+    """
+    try:
+        messages, text = _analysis_messages(df, source_type, query, query_type, None, first_sentences, enable_llm_for_simple)
+        if messages is None:
+            yield text
+            return
+
+        key = make_cache_key(json.dumps(messages, sort_keys=True))
+        cached = _response_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        with _inflight_lock:
+            future = _inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                _inflight[key] = future
+                future.add_done_callback(lambda f: _forget_inflight(key, f))
+        if not owner:
+            result = future.result()
+            if result['success']:
+                yield result['response']
+            else:
+                yield f"AI analysis unavailable: {result['error'][:100]}..."
+            return
+
+        chunks = []
+        try:
+            for chunk in get_shared_api().stream_with_fallback(
+                messages, max_tokens=800, temperature=0.3, preferred_free=LLM_PREFER_FREE_MODELS, complexity=_task_complexity(source_type)
+            ):
+                chunks.append(chunk)
+                yield chunk
+            response = "".join(chunks)
+            _response_cache.set(key, response)
+            future.set_result({'success': True, 'response': response, 'model': 'stream'})
+        finally:
+            # Failed or abandoned (e.g. a Streamlit rerun) streams must still release anyone waiting
+            if not future.done():
+                future.set_result({'success': False, 'error': 'Streaming analysis did not complete', 'model': 'none'})
+    except Exception as e:
+        yield _unavailable_message(e)
+
+def run_section_analyses(results, query, query_type):
+    """Analyze the sections that need no context from earlier summaries, concurrently.
+
+    These are the simple listing sections plus the first detailed section. The remaining
+    detailed sections are streamed as they render, with these summaries as their context.
+    """
+    present = [source for source in SECTION_ORDER if source in results and not results[source].empty]
+    detailed = [source for source in present if source not in SIMPLE_SOURCES]
+    independent = [source for source in present if source in SIMPLE_SOURCES] + detailed[:1]
+    if not independent:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=len(independent)) as pool:
+        futures = {
+            source: pool.submit(run_llm_analysis, results[source], source, query, query_type)
+            for source in independent
+        }
+        return {source: future.result() for source, future in futures.items()}
+
+_SUMMARY_HEADER_RE = re.compile(r"(MAIN OBSERVATION:|WHAT THIS MIGHT MEAN:|OTHER DETAILS:|IMPORTANT NOTE:)")
 
 def format_llm_summary(summary):
-    headers = ["MAIN OBSERVATION:", "WHAT THIS MIGHT MEAN:", "OTHER DETAILS:", "IMPORTANT NOTE:"]
-    for header in headers:
-        summary = summary.replace(header, f"**{header}**")
-    summary = '\n\n'.join([line.strip() for line in summary.split('\n') if line.strip()])
+    summary = _SUMMARY_HEADER_RE.sub(r"**\1**", summary)
+    summary = '\n\n'.join(filter(None, (line.strip() for line in summary.splitlines())))
     if "No specific data" in summary:
         return f"*{summary}*"
     return summary
 
-def display_section_with_ai_summary(title, df, source, query, query_type, show_raw_data=False):
+def _render_summary(placeholder, summary):
+    placeholder.markdown(
+        f"""
+        <div style="background-color:#fff8dc; padding:20px; border-radius:10px; border:1px solid #eee; margin-bottom:1rem;">
+            {format_llm_summary(summary)}
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+def record_section_summaries(summaries):
+    """Store finished summaries in session state, extracting each one's context sentence once."""
+    st.session_state.section_results.update(summaries)
+    sentences = st.session_state.setdefault('section_first_sentences', {})
+    for source, summary in summaries.items():
+        sentence = None if source in SIMPLE_SOURCES else first_sentence(summary)
+        if sentence:
+            sentences[source] = sentence
+
+def display_section_with_ai_summary(title, df, source, query, query_type, show_raw_data=False, summary=None):
     st.subheader(title)
     if df.empty:
         st.info(f"No data found for {title}.")
-        st.session_state.section_results[source] = f"No data provided for {source}."
+        record_section_summaries({source: f"No data provided for {source}."})
         return
 
-    with st.spinner(f"Analyzing {source} data..."):
-        summary = run_llm_analysis(
-            df, source, query, query_type, section_results=st.session_state.get('section_results', {})
-        )
-        st.session_state.section_results[source] = summary
-        with st.container(border=True, height=400):
-            formatted_summary = format_llm_summary(summary)
-            st.markdown(
-                f"""
-                <div style="background-color:#fff8dc; padding:20px; border-radius:10px; border:1px solid #eee; margin-bottom:1rem;">
-                    {formatted_summary}
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-
-            if show_raw_data:
-                with st.expander("View Detailed Data Sample", expanded=True):
-                    cols_to_display = DISPLAY_COLUMNS.get(source, df.columns.tolist())
-                    filtered_cols = [col for col in cols_to_display if col in df.columns]
-                    st.dataframe(df[filtered_cols], use_container_width=True)
-            else:
-                with st.expander("View Detailed Data Sample"):
-                    cols_to_display = DISPLAY_COLUMNS.get(source, df.columns.tolist())
-                    filtered_cols = [col for col in cols_to_display if col in df.columns]
-                    st.dataframe(df[filtered_cols], use_container_width=True)
+    with st.container(border=True, height=400):
+        placeholder = st.empty()
+        if summary is None:
+            placeholder.caption(f"Analyzing {source} data...")
+            summary = ""
+            for chunk in stream_llm_analysis(
+                df, source, query, query_type, first_sentences=st.session_state.get('section_first_sentences', {})
+            ):
+                summary += chunk
+                _render_summary(placeholder, summary)
+            summary = summary.strip()
+        _render_summary(placeholder, summary)
+        record_section_summaries({source: summary})
+
+        with st.expander("View Detailed Data Sample", expanded=show_raw_data):
+            cols_to_display = DISPLAY_COLUMNS.get(source, df.columns.tolist())
+            filtered_cols = [col for col in cols_to_display if col in df.columns]
+            preview = df[filtered_cols]
+            if len(preview) > RAW_DATA_PREVIEW_ROWS:
+                # Only rows actually sent get serialized to the browser on each rerun
+                if not st.checkbox(f"Show all {len(preview)} rows", key=f"show_all_rows_{source}"):
+                    st.caption(f"Showing first {RAW_DATA_PREVIEW_ROWS} of {len(preview)} rows.")
+                    preview = preview.head(RAW_DATA_PREVIEW_ROWS)
+            st.dataframe(preview, use_container_width=True)
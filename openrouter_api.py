@@ -1,13 +1,18 @@
 import requests
 import json
 import os
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Iterator, List, Optional, Tuple
 
 class OpenRouterAPI:
     def __init__(self):
         self.api_key = self._load_api_key()
         self.base_url = "https://openrouter.ai/api/v1"
+        self.session = self._create_session()
         self.fallback_models = [
             'meta-llama/llama-3.1-8b-instruct:free',
             'google/gemma-2-9b-it:free',
@@ -18,8 +23,31 @@ class OpenRouterAPI:
             'anthropic/claude-3-haiku',
             'google/gemini-flash-1.5'
         ]
+        # Callers that opt into paid models send complex analyses to the strongest one first
+        self.complex_models = [
+            'anthropic/claude-3-haiku',
+            'openai/gpt-4o-mini',
+            'google/gemini-flash-1.5'
+        ]
+
+    @staticmethod
+    def _create_session() -> requests.Session:
+        # Only retry connections that never reached the server: a re-sent completion POST can be
+        # billed twice, and chat_with_fallback already moves on to another model on 429/5xx
+        retry = Retry(
+            total=2,
+            connect=2,
+            read=False,
+            status_forcelist=(),
+            backoff_factor=0.3
+        )
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+        return session
 
-    def _load_api_key(self) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _load_api_key() -> str:
         api_key = os.getenv('OPENROUTER_API_KEY')
         if api_key:
             return api_key
@@ -53,7 +81,7 @@ class OpenRouterAPI:
         }
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
                 headers=headers,
                 json=payload,
@@ -97,20 +125,118 @@ class OpenRouterAPI:
                 'model': model_id
             }
 
+    def chat_completion_stream(self, model_id: str, messages: List[Dict], max_tokens: int = 1000, temperature: float = 0.7) -> Iterator[str]:
+        """Yield response text deltas as they arrive over server-sent events."""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "model": model_id,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True
+        }
+        
+        with self.session.post(
+            f"{self.base_url}/chat/completions",
+            headers=headers,
+            json=payload,
+            timeout=30,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get('choices') or [{}]
+                content = choices[0].get('delta', {}).get('content')
+                if content:
+                    yield content
+
+    def _model_tiers(self, preferred_free: bool, complexity: Optional[str]) -> Tuple[List[str], List[str]]:
+        """Primary and secondary model lists.
+
+        Free models always go first when preferred_free is set; complexity ('complex') only
+        reorders the paid models for callers that opted out of it. Every tier keeps the full
+        default chain as its secondary list, so a rate-limited or unavailable primary never
+        ends the fallback early.
+        """
+        if preferred_free:
+            primary = self.fallback_models
+        elif complexity == 'complex':
+            primary = self.complex_models
+        else:
+            primary = self.preferred_models
+        secondary = [model for model in dict.fromkeys(self.fallback_models + self.preferred_models) if model not in primary]
+        return primary, secondary
+
+    def stream_with_fallback(self, messages: List[Dict], max_tokens: int = 1000, temperature: float = 0.7, preferred_free: bool = True, complexity: Optional[str] = None) -> Iterator[str]:
+        """Stream from the first model that starts producing output; fall back only before the first delta."""
+        primary, secondary = self._model_tiers(preferred_free, complexity)
+        
+        for model in primary + secondary:
+            stream = self.chat_completion_stream(model, messages, max_tokens, temperature)
+            try:
+                first = next(stream)
+            except (StopIteration, requests.exceptions.RequestException, ValueError):
+                continue
+            yield first
+            yield from stream
+            return
+                
+        raise RuntimeError("All models failed")
+
     def get_best_model(self, preferred_free: bool = True) -> str:
         models_to_try = self.fallback_models if preferred_free else self.preferred_models
         return models_to_try[0]
 
-    def chat_with_fallback(self, messages: List[Dict], max_tokens: int = 1000, temperature: float = 0.7, preferred_free: bool = True) -> Dict:
-        models_to_try = (self.fallback_models + self.preferred_models) if preferred_free else (self.preferred_models + self.fallback_models)
-        
-        for model in models_to_try:
-            result = self.chat_completion(model, messages, max_tokens, temperature)
-            if result['success']:
-                return result
+    def chat_with_fallback(self, messages: List[Dict], max_tokens: int = 1000, temperature: float = 0.7, preferred_free: bool = True, hedge: bool = False, complexity: Optional[str] = None) -> Dict:
+        primary, secondary = self._model_tiers(preferred_free, complexity)
+
+        if hedge:
+            # Race each tier in parallel; the second tier only launches once the first has failed
+            for tier in (primary, secondary):
+                if not tier:
+                    continue
+                result = self._race_models(tier, messages, max_tokens, temperature)
+                if result['success']:
+                    return result
+        else:
+            for model in primary + secondary:
+                result = self.chat_completion(model, messages, max_tokens, temperature)
+                if result['success']:
+                    return result
                 
         return {
             'success': False,
             'error': 'All models failed',
             'model': 'none'
-        }
\ No newline at end of file
+        }
+
+    def _race_models(self, models: List[str], messages: List[Dict], max_tokens: int, temperature: float) -> Dict:
+        """Call all models concurrently and return the first successful response."""
+        executor = ThreadPoolExecutor(max_workers=len(models))
+        futures = [executor.submit(self.chat_completion, model, messages, max_tokens, temperature) for model in models]
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                if result['success']:
+                    return result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return {
+            'success': False,
+            'error': 'All models failed',
+            'model': 'none'
+        }
+
+@functools.lru_cache(maxsize=1)
+def get_shared_api() -> OpenRouterAPI:
+    """Process-wide client, so every caller reuses one pooled HTTP session."""
+    return OpenRouterAPI()
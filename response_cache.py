@@ -0,0 +1,91 @@
+"""
+SQLite-backed response cache with per-entry expiry and an optional in-memory front layer.
+Lets repeat requests with identical inputs skip the network entirely.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+def make_cache_key(*parts: str) -> str:
+    """Deterministic content-addressed key for the given string parts."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class ResponseCache:
+    def __init__(self, path: str, ttl: int, memory_ttl: int = 0, memory_size: int = 256):
+        self.path = path
+        self.ttl = ttl
+        self.memory_ttl = memory_ttl
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        return self._conn
+
+    def _remember(self, key: str, response: str, expires_at: float) -> None:
+        """Keep a hot copy in memory for at most memory_ttl, never past the stored expiry. Caller holds the lock."""
+        if not self.memory_ttl:
+            return
+        self._memory[key] = (min(expires_at, time.time() + self.memory_ttl), response)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                return entry[1]
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT response, expires_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    self._remember(key, row[0], row[1])
+        except sqlite3.Error as e:
+            logging.warning(f"Response cache read failed: {e}")
+            return None
+        if row and row[1] > now:
+            return row[0]
+        return None
+
+    def set(self, key: str, response: str, ttl: Optional[int] = None) -> None:
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        try:
+            with self._lock:
+                self._remember(key, response, expires_at)
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, response, expires_at) VALUES (?, ?, ?)",
+                    (key, response, expires_at)
+                )
+                # Expired rows are never read again; drop them so the file doesn't grow without bound
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Response cache write failed: {e}")
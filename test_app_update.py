@@ -2,10 +2,43 @@
 Quick test of updated app functionality
 """
 
-from app_w_llm import cached_get_fda_data, determine_query_type
+from app_w_llm import determine_query_type
+from data_retrieval_enhanced import EnhancedFDARetriever
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 import time
 
+SOURCES = ["classification", "udi", "510k", "pma", "recall", "event"]
+
+def _time_source(retriever, query, source):
+    """Fetch one endpoint and return (record count, seconds taken)."""
+    start = time.time()
+    df = retriever.get_comprehensive_data(query, source, max_records=100)
+    return len(df), time.time() - start
+
+def test_endpoint_timings(query):
+    """Fetch every endpoint concurrently and uncached, timing each one to find the slowest."""
+    retriever = EnhancedFDARetriever(rate_limit_delay=0.2, use_cache=False)
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=len(SOURCES)) as ex:
+        futures = {source: ex.submit(_time_source, retriever, query, source) for source in SOURCES}
+        timings = {}
+        for source, future in futures.items():
+            try:
+                timings[source] = future.result()
+            except Exception as e:
+                print(f"  ✗ {source}: {e}")
+    wall_time = time.time() - start_time
+    
+    for source, (records, elapsed) in sorted(timings.items(), key=lambda item: -item[1][1]):
+        print(f"  {source}: {records} records in {elapsed:.1f}s")
+    if timings:
+        slowest = max(timings, key=lambda source: timings[source][1])
+        serial_time = sum(elapsed for _, elapsed in timings.values())
+        print(f"  Slowest endpoint: {slowest}")
+        print(f"  Wall-clock: {wall_time:.1f}s (serial sum {serial_time:.1f}s)")
+    return timings, wall_time
+
 def test_app_components():
     """Test key app components."""
     
@@ -22,31 +55,20 @@ def test_app_components():
         print(f"⚠ Query type determination failed (expected): {e}")
         query, query_type = "insulin pump", "device"  # Fallback
     
-    # Test 2: Enhanced data retrieval  
+    # Test 2: Enhanced data retrieval, timed cold per endpoint
     print(f"\n2. Testing enhanced data retrieval for '{query}'...")
-    start_time = time.time()
     
     try:
-        results = cached_get_fda_data(query, query_type, limit=5, date_months=6)
-        retrieval_time = time.time() - start_time
+        timings, retrieval_time = test_endpoint_timings(query)
         
         print(f"✓ Enhanced retrieval completed in {retrieval_time:.1f}s")
         
-        total_records = 0
-        sources_with_data = 0
-        
-        print(f"Results for {query_type} view:")
-        for source, df in results[query_type].items():
-            if not df.empty:
-                total_records += len(df)
-                sources_with_data += 1
-                print(f"  ✓ {source}: {len(df)} records")
-            else:
-                print(f"  ✗ {source}: No data")
+        total_records = sum(records for records, _ in timings.values())
+        sources_with_data = sum(1 for records, _ in timings.values() if records)
         
         print(f"\nSummary:")
         print(f"  Total records: {total_records}")
-        print(f"  Sources with data: {sources_with_data}/6")
+        print(f"  Sources with data: {sources_with_data}/{len(SOURCES)}")
         print(f"  Performance: {retrieval_time:.1f}s")
         
         if total_records > 50:
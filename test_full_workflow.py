@@ -2,18 +2,19 @@
 
 import sys
 import os
+import asyncio
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from fda_data import get_fda_data
 from llm_utils import run_llm_analysis
-from openrouter_api import OpenRouterAPI
+from openrouter_api import get_shared_api
 import pandas as pd
 
 def test_api_connection():
     """Test basic OpenRouter API connectivity"""
     print("🔧 Testing OpenRouter API connection...")
     try:
-        api = OpenRouterAPI()
+        api = get_shared_api()
         print(f"✓ API key loaded: {api.api_key[:8]}...")
         
         messages = [{"role": "user", "content": "Reply with just: API_TEST_SUCCESS"}]
@@ -64,6 +65,15 @@ def test_fda_data_retrieval():
     
     return None, None, None
 
+async def _analyze_sources(data, query, query_type):
+    """Run every non-empty source's analysis concurrently; failures come back as exceptions."""
+    sources = [source for source, df in data.items() if not df.empty]
+    summaries = await asyncio.gather(
+        *(asyncio.to_thread(run_llm_analysis, data[source], source, query, query_type) for source in sources),
+        return_exceptions=True
+    )
+    return dict(zip(sources, summaries))
+
 def test_ai_analysis(results, query, query_type):
     """Test AI analysis of FDA data"""
     print(f"\n🤖 Testing AI analysis for '{query}' ({query_type})...")
@@ -75,21 +85,17 @@ def test_ai_analysis(results, query, query_type):
     data = results[query_type]
     analysis_count = 0
     
-    for source, df in data.items():
-        if not df.empty:
-            print(f"\n  Analyzing {source} data ({len(df)} records)...")
-            try:
-                summary = run_llm_analysis(df, source, query, query_type)
-                
-                if "AI analysis unavailable" in summary:
-                    print(f"    ✗ Analysis failed: {summary}")
-                else:
-                    print(f"    ✓ Analysis successful!")
-                    print(f"    Summary preview: {summary[:100]}...")
-                    analysis_count += 1
-                    
-            except Exception as e:
-                print(f"    ✗ Analysis error: {str(e)}")
+    summaries = asyncio.run(_analyze_sources(data, query, query_type))
+    for source, summary in summaries.items():
+        print(f"\n  Analyzed {source} data ({len(data[source])} records)...")
+        if isinstance(summary, Exception):
+            print(f"    ✗ Analysis error: {str(summary)}")
+        elif "AI analysis unavailable" in summary:
+            print(f"    ✗ Analysis failed: {summary}")
+        else:
+            print(f"    ✓ Analysis successful!")
+            print(f"    Summary preview: {summary[:100]}...")
+            analysis_count += 1
     
     if analysis_count > 0:
         print(f"\n✓ AI analysis successful for {analysis_count} data sources")
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Offline checks for the LLM prompt preparation helpers
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from llm_utils import prepare_data_for_llm, section_context
+
+def test_prepare_data_handles_missing_values():
+    """Gaps in deduplicated fields (NaN and None) must not break the sample preparation."""
+    df = pd.DataFrame({
+        "date_received": ["20240101", "20240102", "20240103"],
+        "manufacturer_name": ["Acme", np.nan, np.nan],
+        "product_problems": [None, "Battery", "Battery"],
+        "device.brand_name": ["Pump", None, None],
+        "device.generic_name": [np.nan, "insulin pump", "insulin pump"]
+    })
+
+    data = prepare_data_for_llm(df, "EVENT")
+
+    records = data["sample_records"]
+    assert data["num_total_records_in_source"] == 3
+    assert len(records) == 2
+    assert "duplicate_count" not in records[0]
+    assert records[1]["duplicate_count"] == 2
+
+def test_section_context_skips_listing_sections():
+    """Templated UDI/CLASSIFICATION listings must not leak into later prompts."""
+    context = section_context({
+        "UDI": "MAIN OBSERVATION:\nMost common values across 20 UDI records:\n**Common brands:** Pump (3)",
+        "RECALL": "Three Class II recalls involve battery failures"
+    })
+
+    assert context == "Context from earlier sections:\n* RECALL: Three Class II recalls involve battery failures"
+    assert section_context({"CLASSIFICATION": "MAIN OBSERVATION:\nMost common values"}) is None
+
+if __name__ == "__main__":
+    test_prepare_data_handles_missing_values()
+    print("✓ prepare_data_for_llm handles missing values")
+    test_section_context_skips_listing_sections()
+    print("✓ section_context skips listing sections")
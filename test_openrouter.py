@@ -4,11 +4,11 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from openrouter_api import OpenRouterAPI
+from openrouter_api import get_shared_api
 
 def test_openrouter():
     try:
-        api = OpenRouterAPI()
+        api = get_shared_api()
         print(f"✓ OpenRouter API initialized successfully")
         print(f"✓ Using API key: {api.api_key[:8]}...")
         
@@ -0,0 +1,11 @@
+"""
+Shared helpers for the pipeline test scripts.
+"""
+
+def count_records(data):
+    """Total rows across an enhanced {source: DataFrame} result."""
+    return sum(df.shape[0] for df in data.values())
+
+def count_nested_records(data):
+    """Total rows across the original pipeline's {view: {source: DataFrame}} result."""
+    return sum(df.shape[0] for category in data.values() for df in category.values())
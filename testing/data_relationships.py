@@ -3,74 +3,174 @@ Cross-Source Data Relationship Mapping
 Links related records across FDA databases for comprehensive device profiles.
 """
 
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple, Set, Optional
-from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Tuple, Set, Optional
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import math
 import re
+from itertools import repeat
+
+# Recall class numeral, with or without openFDA's "Class " prefix
+_RECALL_CLASS_RE = re.compile(r"^\s*(?:Class\s+)?(I{1,3})\s*$")
+
+# Risk points per recall, indexed by class code
+_RECALL_CLASS_WEIGHTS = np.array([0.0, 30.0, 15.0, 5.0])
+
+_PROFILE_CACHE_SIZE = 32
+
+_NAME_FIELDS = frozenset({"device_name", "trade_name", "generic_name", "product_description",
+                          "device.brand_name", "device.generic_name", "brand_name"})
+_CODE_FIELDS = frozenset({"product_code", "device.device_report_product_code"})
+_MFG_FIELDS = frozenset({"applicant", "manufacturer_name", "recalling_firm", "company_name"})
+
+def _problem_text(problem) -> str:
+    """product_problems may be a list, NaN, or a scalar; render any of them as short description text."""
+    if isinstance(problem, list):
+        return ', '.join(map(str, problem)) or "Adverse event"
+    if problem is None or (isinstance(problem, float) and math.isnan(problem)):
+        return "Adverse event"
+    return str(problem) or "Adverse event"
 
 @dataclass
 class DeviceProfile:
     device_name: str
-    manufacturers: Set[str]
-    product_codes: Set[str]
-    clearances: List[Dict]
-    approvals: List[Dict]
-    recalls: List[Dict]
-    adverse_events: List[Dict]
-    classifications: List[Dict]
+    manufacturers: pd.Index
+    product_codes: pd.Index
+    # One column per record field; only ever filtered and counted, so kept columnar
+    clearances: pd.DataFrame
+    approvals: pd.DataFrame
+    recalls: pd.DataFrame
+    adverse_events: pd.DataFrame
+    classifications: pd.DataFrame
     risk_score: float
     timeline: List[Tuple[datetime, str, str]]  # (date, event_type, description)
+    # Tallies computed column-wise while processing, so scoring needs no record walk
+    # Recall counts indexed by class code (0 = unknown, 1 = Class I, 2 = Class II, 3 = Class III)
+    recall_class_counts: np.ndarray = field(default_factory=lambda: np.zeros(4, dtype=np.int64))
+    serious_events: int = 0
+    high_risk_class: bool = False
+    # Sorted timeline dates, parallel to timeline, for binary-search recency windows
+    timeline_dates: np.ndarray = field(default_factory=lambda: np.array([], dtype="datetime64[ns]"))
+
+    @property
+    def class_1_recalls(self) -> int:
+        return int(self.recall_class_counts[1])
+
+    def recent_timeline(self, n: int = 5) -> List[Tuple[str, str, str]]:
+        """Last n timeline entries as (YYYY-MM-DD, event_type, description), dates formatted in one vectorized pass."""
+        if not self.timeline:
+            return []
+        dates = self.timeline_dates[-n:]
+        labels = np.where(np.isnat(dates), "Unknown", np.datetime_as_string(dates, unit="D")).tolist()
+        return [(label, event_type, description) for label, (_, event_type, description) in zip(labels, self.timeline[-n:])]
 
 class DataRelationshipMapper:
     def __init__(self):
         self.product_code_cache = {}
         self.manufacturer_aliases = {}
+        self._profile_cache: "OrderedDict[tuple, DeviceProfile]" = OrderedDict()
         
     def create_comprehensive_profile(self, fda_data: Dict[str, pd.DataFrame], primary_query: str) -> DeviceProfile:
-        """Create a comprehensive device profile by linking related records."""
+        """Create a comprehensive device profile by linking related records.
         
+        Profiles are memoized per mapper on the query plus a content hash of every source frame,
+        so reruns over identical data skip all processing.
+        """
+        key = self._profile_key(fda_data, primary_query)
+        if key in self._profile_cache:
+            self._profile_cache.move_to_end(key)
+            return self._profile_cache[key]
+        
+        profile = self._build_profile(fda_data, primary_query)
+        self._profile_cache[key] = profile
+        if len(self._profile_cache) > _PROFILE_CACHE_SIZE:
+            self._profile_cache.popitem(last=False)
+        return profile
+    
+    @staticmethod
+    def _profile_key(fda_data: Dict[str, pd.DataFrame], primary_query: str) -> tuple:
+        def frame_hash(df: pd.DataFrame) -> int:
+            try:
+                hashes = pd.util.hash_pandas_object(df, index=False)
+            except TypeError:
+                # List-valued cells (e.g. product_problems) are unhashable; hash their text instead
+                hashes = pd.util.hash_pandas_object(df.astype(str), index=False)
+            return int(hashes.sum())
+        
+        return (primary_query, tuple(sorted(
+            (source, tuple(df.columns), len(df), frame_hash(df)) for source, df in fda_data.items()
+        )))
+    
+    def _build_profile(self, fda_data: Dict[str, pd.DataFrame], primary_query: str) -> DeviceProfile:
         # Extract all potential device identifiers
         identifiers = self._extract_device_identifiers(fda_data, primary_query)
         
         # Build device profile
-        profile = DeviceProfile(
-            device_name=primary_query,
-            manufacturers=set(),
-            product_codes=set(),
-            clearances=[],
-            approvals=[],
-            recalls=[],
-            adverse_events=[],
-            classifications=[],
-            risk_score=0.0,
-            timeline=[]
-        )
+        profile = self._empty_profile(primary_query)
         
-        # Process each data source
-        for source, df in fda_data.items():
-            if df.empty:
-                continue
-                
-            if source == "510K":
-                self._process_510k_data(df, profile, identifiers)
-            elif source == "PMA":
-                self._process_pma_data(df, profile, identifiers)
-            elif source == "RECALL":
-                self._process_recall_data(df, profile, identifiers)
-            elif source == "EVENT":
-                self._process_event_data(df, profile, identifiers)
-            elif source == "CLASSIFICATION":
-                self._process_classification_data(df, profile, identifiers)
+        # Process each data source into its own partial profile concurrently, then merge in source order
+        processors = {
+            "510K": self._process_510k_data,
+            "PMA": self._process_pma_data,
+            "RECALL": self._process_recall_data,
+            "EVENT": self._process_event_data,
+            "CLASSIFICATION": self._process_classification_data
+        }
+        jobs = [(processors[source], df) for source, df in fda_data.items() if source in processors and not df.empty]
+        if jobs:
+            with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+                partials = list(pool.map(lambda job: self._run_processor(job[0], job[1], primary_query, identifiers), jobs))
+            for partial in partials:
+                self._merge_profile(profile, partial)
                 
         # Calculate risk score
         profile.risk_score = self._calculate_risk_score(profile)
         
         # Sort timeline
         profile.timeline.sort(key=lambda x: x[0] if x[0] else datetime.min)
+        profile.timeline_dates = np.array([event[0] for event in profile.timeline], dtype="datetime64[ns]")
         
         return profile
     
+    @staticmethod
+    def _empty_profile(device_name: str) -> DeviceProfile:
+        return DeviceProfile(
+            device_name=device_name,
+            manufacturers=pd.Index([], dtype=object),
+            product_codes=pd.Index([], dtype=object),
+            clearances=pd.DataFrame(),
+            approvals=pd.DataFrame(),
+            recalls=pd.DataFrame(),
+            adverse_events=pd.DataFrame(),
+            classifications=pd.DataFrame(),
+            risk_score=0.0,
+            timeline=[]
+        )
+    
+    def _run_processor(self, processor, df: pd.DataFrame, device_name: str, identifiers: Dict[str, Set[str]]) -> DeviceProfile:
+        """Run one source processor against a fresh profile so sources never share mutable state."""
+        partial = self._empty_profile(device_name)
+        processor(df, partial, identifiers)
+        return partial
+    
+    @staticmethod
+    def _merge_profile(profile: DeviceProfile, partial: DeviceProfile):
+        profile.manufacturers = profile.manufacturers.union(partial.manufacturers)
+        profile.product_codes = profile.product_codes.union(partial.product_codes)
+        for field in ("clearances", "approvals", "recalls", "adverse_events", "classifications"):
+            current, incoming = getattr(profile, field), getattr(partial, field)
+            if incoming.empty:
+                continue
+            setattr(profile, field, incoming if current.empty else pd.concat([current, incoming], ignore_index=True))
+        profile.timeline.extend(partial.timeline)
+        profile.recall_class_counts = profile.recall_class_counts + partial.recall_class_counts
+        profile.serious_events += partial.serious_events
+        profile.high_risk_class = profile.high_risk_class or partial.high_risk_class
+    
     def _extract_device_identifiers(self, fda_data: Dict[str, pd.DataFrame], query: str) -> Dict[str, Set[str]]:
         """Extract all potential device identifiers for cross-referencing."""
         identifiers = {
@@ -91,26 +191,16 @@ class DataRelationshipMapper:
                 continue
                 
             # Device names
-            name_fields = ["device_name", "trade_name", "generic_name", "product_description", 
-                          "device.brand_name", "device.generic_name", "brand_name"]
-            for field in name_fields:
-                if field in df.columns:
-                    names = df[field].dropna().str.lower().unique()
-                    identifiers["device_names"].update(names)
+            names = self._stacked_values(df, _NAME_FIELDS)
+            identifiers["device_names"].update(names.str.lower().dropna().unique())
             
             # Product codes
-            code_fields = ["product_code", "device.device_report_product_code"]
-            for field in code_fields:
-                if field in df.columns:
-                    codes = df[field].dropna().unique()
-                    identifiers["product_codes"].update(codes)
+            codes = self._stacked_values(df, _CODE_FIELDS)
+            identifiers["product_codes"].update(codes.unique())
                     
             # Manufacturers
-            mfg_fields = ["applicant", "manufacturer_name", "recalling_firm", "company_name"]
-            for field in mfg_fields:
-                if field in df.columns:
-                    mfgs = df[field].dropna().str.lower().unique()
-                    identifiers["manufacturers"].update(mfgs)
+            mfgs = self._stacked_values(df, _MFG_FIELDS)
+            identifiers["manufacturers"].update(mfgs.str.lower().dropna().unique())
                     
             # Regulatory numbers
             if "k_number" in df.columns:
@@ -122,159 +212,128 @@ class DataRelationshipMapper:
                 
         return identifiers
     
+    @staticmethod
+    def _stacked_values(df: pd.DataFrame, fields: FrozenSet[str]) -> pd.Series:
+        """Non-null values of every present field stacked into one Series, so each category is deduplicated in a single pass."""
+        present = fields.intersection(df.columns)
+        if not present:
+            return pd.Series([], dtype=object)
+        return pd.concat([df[field] for field in present], ignore_index=True).dropna()
+    
+    @staticmethod
+    def _parse_dates(values: pd.Series) -> pd.Series:
+        """Parse a whole date column in one pass; unparseable values become NaT and drop out of the timeline.
+        
+        openFDA device endpoints report YYYYMMDD, so that fixed format is tried first; only values it
+        rejects (e.g. ISO recall dates) go through the slower mixed-format parser.
+        """
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values
+        parsed = pd.to_datetime(values, format="%Y%m%d", errors="coerce")
+        leftover = parsed.isna() & values.notna()
+        if leftover.any():
+            parsed[leftover] = pd.to_datetime(values[leftover], format="mixed", errors="coerce")
+        return parsed
+    
+    def _dated_rows(self, sub: pd.DataFrame, date_col: str) -> Tuple[pd.Series, pd.DataFrame]:
+        """Parsed dates and their rows, restricted once by a single validity mask to rows whose date parsed."""
+        dates = self._parse_dates(sub[date_col])
+        valid = dates.notna().to_numpy()
+        return dates[valid], sub[valid]
+    
+    @staticmethod
+    def _timeline_entries(dates: pd.Series, event_type: str, descriptions: pd.Series) -> List[Tuple[datetime, str, str]]:
+        return list(zip(dates, repeat(event_type), descriptions))
+    
     def _process_510k_data(self, df: pd.DataFrame, profile: DeviceProfile, identifiers: Dict[str, Set[str]]):
         """Process 510K clearance data."""
-        for _, row in df.iterrows():
-            # Add to profile
-            if pd.notna(row.get("applicant")):
-                profile.manufacturers.add(row["applicant"])
-            if pd.notna(row.get("product_code")):
-                profile.product_codes.add(row["product_code"])
-                
-            clearance = {
-                "k_number": row.get("k_number"),
-                "device_name": row.get("device_name"),
-                "decision_date": row.get("decision_date"),
-                "applicant": row.get("applicant"),
-                "clearance_type": row.get("clearance_type"),
-                "product_code": row.get("product_code")
-            }
-            profile.clearances.append(clearance)
-            
-            # Add to timeline
-            if pd.notna(row.get("decision_date")):
-                date = pd.to_datetime(row["decision_date"])
-                description = f"510K Clearance: {row.get('device_name', 'Device')} by {row.get('applicant', 'Unknown')}"
-                profile.timeline.append((date, "510K_CLEARANCE", description))
+        sub = df.reindex(columns=["k_number", "device_name", "decision_date", "applicant", "clearance_type", "product_code"])
+        profile.manufacturers = profile.manufacturers.union(sub["applicant"].dropna().unique())
+        profile.product_codes = profile.product_codes.union(sub["product_code"].dropna().unique())
+        profile.clearances = sub.reset_index(drop=True)
+        
+        # Add to timeline
+        dates, dated = self._dated_rows(sub, "decision_date")
+        descriptions = ("510K Clearance: " + dated["device_name"].fillna("Device").astype(str)
+                        + " by " + dated["applicant"].fillna("Unknown").astype(str))
+        profile.timeline.extend(self._timeline_entries(dates, "510K_CLEARANCE", descriptions))
     
     def _process_pma_data(self, df: pd.DataFrame, profile: DeviceProfile, identifiers: Dict[str, Set[str]]):
         """Process PMA approval data."""
-        for _, row in df.iterrows():
-            if pd.notna(row.get("applicant")):
-                profile.manufacturers.add(row["applicant"])
-            if pd.notna(row.get("product_code")):
-                profile.product_codes.add(row["product_code"])
-                
-            approval = {
-                "pma_number": row.get("pma_number"),
-                "trade_name": row.get("trade_name"),
-                "decision_date": row.get("decision_date"),
-                "applicant": row.get("applicant"),
-                "supplement_reason": row.get("supplement_reason")
-            }
-            profile.approvals.append(approval)
-            
-            # Add to timeline
-            if pd.notna(row.get("decision_date")):
-                date = pd.to_datetime(row["decision_date"])
-                description = f"PMA Approval: {row.get('trade_name', 'Device')} by {row.get('applicant', 'Unknown')}"
-                profile.timeline.append((date, "PMA_APPROVAL", description))
+        sub = df.reindex(columns=["pma_number", "trade_name", "decision_date", "applicant", "supplement_reason", "product_code"])
+        profile.manufacturers = profile.manufacturers.union(sub["applicant"].dropna().unique())
+        profile.product_codes = profile.product_codes.union(sub["product_code"].dropna().unique())
+        profile.approvals = sub.drop(columns="product_code").reset_index(drop=True)
+        
+        # Add to timeline
+        dates, dated = self._dated_rows(sub, "decision_date")
+        descriptions = ("PMA Approval: " + dated["trade_name"].fillna("Device").astype(str)
+                        + " by " + dated["applicant"].fillna("Unknown").astype(str))
+        profile.timeline.extend(self._timeline_entries(dates, "PMA_APPROVAL", descriptions))
     
     def _process_recall_data(self, df: pd.DataFrame, profile: DeviceProfile, identifiers: Dict[str, Set[str]]):
         """Process recall data with severity assessment."""
-        for _, row in df.iterrows():
-            if pd.notna(row.get("recalling_firm")):
-                profile.manufacturers.add(row["recalling_firm"])
-                
-            recall = {
-                "event_date": row.get("event_date_initiated"),
-                "recalling_firm": row.get("recalling_firm"),
-                "product_description": row.get("product_description"),
-                "recall_classification": row.get("recall_classification"),
-                "reason_for_recall": row.get("reason_for_recall"),
-                "recall_status": row.get("recall_status")
-            }
-            profile.recalls.append(recall)
-            
-            # Add to timeline with severity
-            if pd.notna(row.get("event_date_initiated")):
-                date = pd.to_datetime(row["event_date_initiated"])
-                classification = row.get("recall_classification", "Unknown")
-                reason = row.get("reason_for_recall", "Unspecified")
-                description = f"Class {classification} Recall: {reason[:50]}..."
-                profile.timeline.append((date, "RECALL", description))
+        sub = df.reindex(columns=["event_date_initiated", "recalling_firm", "product_description",
+                                  "recall_classification", "reason_for_recall", "recall_status"])
+        # A handful of distinct labels: classify each category once and index by the int8 category codes
+        sub["recall_classification"] = sub["recall_classification"].astype("category")
+        labels = sub["recall_classification"].cat
+        numerals = labels.categories.astype(str).str.extract(_RECALL_CLASS_RE, expand=False)
+        category_classes = np.append(numerals.str.len().fillna(0).to_numpy(dtype=np.int8), 0)  # "I" -> 1, "II" -> 2, "III" -> 3
+        codes = category_classes[labels.codes.to_numpy()]  # missing values have code -1, which hits the trailing 0
+        profile.recall_class_counts = profile.recall_class_counts + np.bincount(codes, minlength=4)
+        
+        profile.manufacturers = profile.manufacturers.union(sub["recalling_firm"].dropna().unique())
+        profile.recalls = sub.rename(columns={"event_date_initiated": "event_date"}).reset_index(drop=True)
+        
+        # Add to timeline with severity
+        dates, dated = self._dated_rows(sub, "event_date_initiated")
+        descriptions = ("Class " + dated["recall_classification"].astype(object).fillna("Unknown").astype(str)
+                        + " Recall: " + dated["reason_for_recall"].fillna("Unspecified").astype(str).str[:50] + "...")
+        profile.timeline.extend(self._timeline_entries(dates, "RECALL", descriptions))
     
     def _process_event_data(self, df: pd.DataFrame, profile: DeviceProfile, identifiers: Dict[str, Set[str]]):
         """Process adverse event data."""
-        for _, row in df.iterrows():
-            if pd.notna(row.get("manufacturer_name")):
-                profile.manufacturers.add(row["manufacturer_name"])
-                
-            event = {
-                "report_number": row.get("report_number"),
-                "date_received": row.get("date_received"),
-                "event_type": row.get("event_type"),
-                "manufacturer_name": row.get("manufacturer_name"),
-                "product_problems": row.get("product_problems"),
-                "adverse_event_flag": row.get("adverse_event_flag"),
-                "patient_outcomes": row.get("patient_outcomes"),
-                "device_brand": row.get("device.brand_name")
-            }
-            profile.adverse_events.append(event)
-            
-            # Add to timeline
-            if pd.notna(row.get("date_received")):
-                date = pd.to_datetime(row["date_received"])
-                problem = row.get("product_problems", "Adverse event")
-                # Handle case where problem might be a list, float/NaN, or other type
-                try:
-                    if pd.isna(problem):
-                        problem = "Adverse event"
-                    elif isinstance(problem, list):
-                        problem = ', '.join(str(p) for p in problem) if problem else "Adverse event"
-                    elif not isinstance(problem, str):
-                        problem = str(problem) if problem else "Adverse event"
-                except (ValueError, TypeError):
-                    problem = "Adverse event"
-                description = f"Adverse Event: {str(problem)[:50]}..."
-                profile.timeline.append((date, "ADVERSE_EVENT", description))
+        sub = df.reindex(columns=["report_number", "date_received", "event_type", "manufacturer_name", "product_problems",
+                                  "adverse_event_flag", "patient_outcomes", "device.brand_name"])
+        sub["adverse_event_flag"] = sub["adverse_event_flag"].astype("category")
+        profile.serious_events += int((sub["adverse_event_flag"] == "Y").sum())
+        profile.manufacturers = profile.manufacturers.union(sub["manufacturer_name"].dropna().unique())
+        profile.adverse_events = sub.rename(columns={"device.brand_name": "device_brand"}).reset_index(drop=True)
+        
+        # Add to timeline
+        dates, dated = self._dated_rows(sub, "date_received")
+        descriptions = "Adverse Event: " + dated["product_problems"].map(_problem_text).astype(str).str[:50] + "..."
+        profile.timeline.extend(self._timeline_entries(dates, "ADVERSE_EVENT", descriptions))
     
     def _process_classification_data(self, df: pd.DataFrame, profile: DeviceProfile, identifiers: Dict[str, Set[str]]):
         """Process device classification data."""
-        for _, row in df.iterrows():
-            if pd.notna(row.get("product_code")):
-                profile.product_codes.add(row["product_code"])
-                
-            classification = {
-                "device_name": row.get("device_name"),
-                "device_class": row.get("device_class"),
-                "product_code": row.get("product_code"),
-                "medical_specialty": row.get("medical_specialty_description"),
-                "regulation_number": row.get("regulation_number")
-            }
-            profile.classifications.append(classification)
+        sub = df.reindex(columns=["device_name", "device_class", "product_code", "medical_specialty_description", "regulation_number"])
+        profile.product_codes = profile.product_codes.union(sub["product_code"].dropna().unique())
+        profile.classifications = sub.rename(columns={"medical_specialty_description": "medical_specialty"}).reset_index(drop=True)
+        profile.high_risk_class = profile.high_risk_class or bool(sub["device_class"].astype(str).isin(["III", "3"]).any())
     
     def _calculate_risk_score(self, profile: DeviceProfile) -> float:
         """Calculate a risk score based on regulatory history."""
-        score = 0.0
+        # Recall penalties, Class I most serious, as one dot product over the class counts
+        score = float(_RECALL_CLASS_WEIGHTS @ profile.recall_class_counts)
         
-        # Recall penalties
-        for recall in profile.recalls:
-            classification = recall.get("recall_classification", "")
-            if "I" in str(classification):  # Class I (most serious)
-                score += 30
-            elif "II" in str(classification):  # Class II
-                score += 15
-            elif "III" in str(classification):  # Class III
-                score += 5
-                
         # Adverse event penalties
-        serious_events = 0
-        for event in profile.adverse_events:
-            if event.get("adverse_event_flag") == "Y":
-                serious_events += 1
-        score += serious_events * 2
+        score += 2.0 * profile.serious_events
         
         # Device class consideration
-        high_risk_classes = ["III", "3"]
-        for classification in profile.classifications:
-            if classification.get("device_class") in high_risk_classes:
-                score += 10
-                break
+        if profile.high_risk_class:
+            score += 10
                 
         # Normalize to 0-100 scale
         return min(score, 100.0)
     
+    @staticmethod
+    def _events_since(profile: DeviceProfile, window: timedelta) -> List[Tuple[datetime, str, str]]:
+        """Timeline events newer than now - window, located by binary search on the sorted dates."""
+        cutoff = np.datetime64(datetime.now() - window, "ns")
+        return profile.timeline[np.searchsorted(profile.timeline_dates, cutoff, side="right"):]
+    
     def generate_regulatory_summary(self, profile: DeviceProfile) -> Dict[str, any]:
         """Generate a structured regulatory summary."""
         return {
@@ -291,16 +350,12 @@ class DataRelationshipMapper:
                 "total_adverse_events": len(profile.adverse_events)
             },
             "recent_activity": {
-                "last_30_days": [event for event in profile.timeline 
-                               if event[0] and event[0] > datetime.now() - timedelta(days=30)],
-                "last_90_days": [event for event in profile.timeline 
-                               if event[0] and event[0] > datetime.now() - timedelta(days=90)]
+                "last_30_days": self._events_since(profile, timedelta(days=30)),
+                "last_90_days": self._events_since(profile, timedelta(days=90))
             },
             "safety_signals": {
-                "class_1_recalls": len([r for r in profile.recalls 
-                                      if "I" in str(r.get("recall_classification", ""))]),
-                "serious_adverse_events": len([e for e in profile.adverse_events 
-                                             if e.get("adverse_event_flag") == "Y"])
+                "class_1_recalls": profile.class_1_recalls,
+                "serious_adverse_events": profile.serious_events
             }
         }
 
@@ -326,5 +381,5 @@ if __name__ == "__main__":
     summary = mapper.generate_regulatory_summary(profile)
     
     print(f"Risk Score: {profile.risk_score}")
-    print(f"Manufacturers: {profile.manufacturers}")
+    print(f"Manufacturers: {list(profile.manufacturers)}")
     print(f"Timeline events: {len(profile.timeline)}")
\ No newline at end of file
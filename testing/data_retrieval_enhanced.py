@@ -4,11 +4,31 @@ Addresses limitations of current sampling approach.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import functools
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+import json
 import logging
+import logging.handlers
+import os
+import queue
+
+from config import FDA_CACHE_PATH, FDA_CACHE_TTL
+from response_cache import ResponseCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 FDA_ENDPOINTS = {
     "510k": "https://api.fda.gov/device/510k.json",
@@ -19,70 +39,236 @@ FDA_ENDPOINTS = {
     "udi": "https://api.fda.gov/device/udi.json"
 }
 
+# Sort key per source, so pages come back in a stable order
+SORT_FIELDS = {
+    "event": "date_received",
+    "recall": "event_date_initiated",
+    "510k": "decision_date",
+    "pma": "decision_date"
+}
+
+# Date field per source that lookback windows are applied to, as a range clause in the search itself
+DATE_FILTER_FIELDS = {
+    "recall": "event_date_initiated",
+    "event": "date_received",
+    "510k": "decision_date",
+    "pma": "decision_date"
+}
+
+# Fields identifying one record per source, used to drop overlap between search strategies
+RECORD_KEYS = {
+    "510k": ("k_number",),
+    "pma": ("pma_number", "supplement_number"),
+    "event": ("mdr_report_key",),
+    "recall": ("cfres_id", "product_res_number"),
+    "classification": ("product_code",),
+    "udi": ("public_device_record_key",)
+}
+
+# openFDA rejects skip offsets beyond this
+MAX_SKIP = 25000
+
+# openFDA data changes weekly at most, so responses are reusable across runs
+_response_cache = ResponseCache(FDA_CACHE_PATH, FDA_CACHE_TTL)
+
+# In-process memo of processed results per (query, source, max_records); classification and UDI
+# are slow-changing taxonomies, so they stay fresh far longer than events and recalls
+MEMO_SIZE = 64
+MEMO_TTLS = {
+    "classification": 7 * 24 * 3600,
+    "udi": 7 * 24 * 3600
+}
+DEFAULT_MEMO_TTL = 3600
+
+# Upper bound on requests in flight at once across all threads of a retriever
+MAX_CONCURRENT_REQUESTS = 10
+
+# openFDA allows 240 requests/minute per IP without an API key
+FDA_MAX_REQUESTS_PER_SECOND = 4.0
+RATE_LIMIT_BURST = 8
+
+def _loads(payload):
+    """Decode a JSON body; orjson parses the large nested result pages several times faster."""
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+class TokenBucket:
+    """Thread-safe token bucket: allows bursts up to capacity, then paces callers to rate per second."""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve a token now; a negative balance is how long this caller must wait for it
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
 class EnhancedFDARetriever:
-    def __init__(self, rate_limit_delay=0.5):
+    def __init__(self, rate_limit_delay=0.5, use_cache=None):
         self.rate_limit_delay = rate_limit_delay
-        self.session = requests.Session()
+        # CACHE=off in the environment forces fresh responses, e.g. for freshness checks
+        self.use_cache = os.getenv("CACHE", "on").lower() != "off" if use_cache is None else use_cache
+        rate = min(1 / rate_limit_delay, FDA_MAX_REQUESTS_PER_SECOND) if rate_limit_delay > 0 else None
+        self._rate_limiter = TokenBucket(rate, RATE_LIMIT_BURST) if rate else None
+        self.session = self._create_session()
+        self._request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+        self._memo: "OrderedDict[tuple, Tuple[float, pd.DataFrame]]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+        
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """Keep-alive session with a pool sized for concurrent fetches and backoff on throttling/5xx."""
+        retry = Retry(
+            total=5,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"]
+        )
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=retry))
+        session.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip"})
+        return session
         
     def _make_request(self, url: str, params: Dict) -> Optional[Dict]:
-        """Make rate-limited API request with error handling."""
+        """Make rate-limited API request with error handling.
+        
+        Successful responses are served from the on-disk cache when fresh, skipping the network entirely.
+        """
+        key = make_cache_key("fda:v2", url, json.dumps(params, sort_keys=True))
+        if self.use_cache:
+            cached = _response_cache.get(key)
+            if cached is not None:
+                return _loads(cached)
+                
         try:
-            time.sleep(self.rate_limit_delay)
-            response = self.session.get(url, params=params, timeout=30)
+            if self._rate_limiter:
+                self._rate_limiter.acquire()
+            with self._request_slots:
+                response = self.session.get(url, params=params, timeout=30)
             response.raise_for_status()
-            return response.json()
+            data = _loads(response.content)
         except requests.exceptions.RequestException as e:
-            logging.error(f"API request failed: {e}")
+            logger.error("API request failed: %s", e)
             return None
+        except ValueError as e:
+            logger.error("API response was not valid JSON: %s", e)
+            return None
+            
+        if self.use_cache:
+            _response_cache.set(key, response.text)
+        return data
             
-    def get_comprehensive_data(self, query: str, source: str, max_records: int = 1000) -> pd.DataFrame:
-        """Retrieve comprehensive data using pagination."""
+    def get_comprehensive_data(self, query: str, source: str, max_records: int = 1000, since: Optional[datetime] = None) -> pd.DataFrame:
+        """Retrieve comprehensive data using pagination.
+        
+        The first page of each search reports meta.results.total, so the remaining pages are known up
+        front and fetched concurrently by skip offset.
+        
+        With since, sources that have a date field only return records dated on or after it; the
+        range is part of the search, so out-of-window records are never transferred.
+        """
         url = FDA_ENDPOINTS.get(source.lower())
         if not url:
             return pd.DataFrame()
             
+        date_field = DATE_FILTER_FIELDS.get(source.lower())
+        date_clause = None
+        if since and date_field:
+            date_clause = f"{date_field}:[{since:%Y%m%d} TO {datetime.now():%Y%m%d}]"
+            
+        memo_key = (query, source.lower(), max_records, date_clause)
+        with self._memo_lock:
+            entry = self._memo.get(memo_key)
+            if entry and entry[0] > time.monotonic():
+                self._memo.move_to_end(memo_key)
+                return entry[1].copy()
+                
+        df = self._retrieve(url, query, source, max_records, date_clause)
+        
+        expires_at = time.monotonic() + MEMO_TTLS.get(source.lower(), DEFAULT_MEMO_TTL)
+        with self._memo_lock:
+            self._memo[memo_key] = (expires_at, df)
+            self._memo.move_to_end(memo_key)
+            if len(self._memo) > MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return df.copy()
+        
+    def _retrieve(self, url: str, query: str, source: str, max_records: int, date_clause: Optional[str]) -> pd.DataFrame:
         all_results = []
-        skip = 0
+        seen = set()
+        key_fields = RECORD_KEYS.get(source.lower(), ())
         limit = 100  # FDA API limit per request
         
         # Build search query with multiple field variants
         search_queries = self._build_comprehensive_search(query, source)
         
         for search_query in search_queries:
-            skip = 0
-            while len(all_results) < max_records:
-                params = {
-                    "search": search_query,
-                    "limit": min(limit, max_records - len(all_results)),
-                    "skip": skip
-                }
-                
-                # Add sorting for consistent pagination
-                if source.lower() in ["event", "recall"]:
-                    params["sort"] = "date_received:desc" if source.lower() == "event" else "event_date_initiated:desc"
-                elif source.lower() in ["510k", "pma"]:
-                    params["sort"] = "decision_date:desc"
-                    
-                data = self._make_request(url, params)
-                if not data or 'results' not in data or not data['results']:
-                    break
-                    
-                all_results.extend(data['results'])
+            budget = max_records - len(all_results)
+            params = {
+                "search": f"{search_query} AND {date_clause}" if date_clause else search_query,
+                "limit": min(limit, budget)
+            }
+            
+            # Add sorting for consistent pagination
+            sort_field = SORT_FIELDS.get(source.lower())
+            if sort_field:
+                params["sort"] = f"{sort_field}:desc"
                 
-                # Check if we got fewer results than requested (end of data)
-                if len(data['results']) < limit:
-                    break
+            data = self._make_request(url, params)
+            if data and data.get('results'):
+                # Record budgets stay far below the skip cap; the clamp only guards oversized requests
+                target = min(data.get('meta', {}).get('results', {}).get('total', 0), budget, MAX_SKIP)
+                rest = self._fetch_pages(url, params, target)
                     
-                skip += limit
+                # Later strategies overlap earlier ones heavily; keep only records not seen yet
+                for record in data['results'] + rest:
+                    key = tuple(record.get(field) for field in key_fields)
+                    if not any(key):
+                        all_results.append(record)
+                    elif key not in seen:
+                        seen.add(key)
+                        all_results.append(record)
                 
             # If we found enough results with first query, break
             if len(all_results) >= max_records * 0.8:
                 break
                 
-        return self._process_results(all_results, source)
+        return self._process_results(all_results[:max_records], source)
     
-    def _build_comprehensive_search(self, query: str, source: str) -> List[str]:
-        """Build multiple search variants for comprehensive coverage."""
+    def _fetch_pages(self, url: str, params: Dict, target: int) -> List[Dict]:
+        """Fetch the pages after the first one concurrently, returning their results in offset order.
+        
+        Each page asks for exactly the records still needed, so the last one never over-fetches
+        and no request is spent discovering the end of the data.
+        """
+        page_size = params["limit"]
+        skips = range(page_size, target, page_size)
+        if not skips:
+            return []
+        
+        def fetch(skip):
+            return self._make_request(url, {**params, "skip": skip, "limit": min(page_size, target - skip)})
+            
+        with ThreadPoolExecutor(max_workers=min(len(skips), MAX_CONCURRENT_REQUESTS)) as pool:
+            pages = list(pool.map(fetch, skips))
+        return [record for page in pages if page for record in page.get('results', [])]
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _build_comprehensive_search(query: str, source: str) -> Tuple[str, ...]:
+        """Build multiple search variants for comprehensive coverage.
+        
+        A pure function of (query, source), so repeat queries reuse the built strings.
+        """
         queries = []
         
         # Clean query - use spaces, not + for multi-word terms
@@ -100,7 +286,7 @@ class EnhancedFDARetriever:
         
         fields = field_maps.get(source.lower(), [])
         if not fields:
-            return []
+            return ()
         
         # Strategy 1: AND search for multi-word queries
         if len(words) > 1:
@@ -124,7 +310,8 @@ class EnhancedFDARetriever:
             exact_queries = [f"{field}:{single_query}" for field in fields]
             queries.append(f"({' OR '.join(exact_queries)})")
         
-        return queries[:3]  # Limit to 3 strategies to avoid overload
+        # A single word yields the same query for strategies 2 and 3; never send one twice
+        return tuple(dict.fromkeys(queries))[:3]  # Limit to 3 strategies to avoid overload
     
     def _process_results(self, results: List[Dict], source: str) -> pd.DataFrame:
         """Process raw API results into structured DataFrame."""
@@ -148,13 +335,18 @@ class EnhancedFDARetriever:
     
     def _process_event_data(self, df: pd.DataFrame, results: List[Dict]) -> pd.DataFrame:
         """Enhanced processing for complex event data structure."""
+        # Build each derived column as a plain list, then assign all columns at once
+        device_fields = ['brand_name', 'generic_name', 'device_report_product_code']
+        columns = {f'device.{field}': [None] * len(results) for field in device_fields}
+        outcomes_col = [None] * len(results)
+        
         for idx, result in enumerate(results):
             # Extract device information
             if 'device' in result and result['device']:
                 for device in result['device'][:3]:  # Process up to 3 devices per report
-                    for field in ['brand_name', 'generic_name', 'device_report_product_code']:
+                    for field in device_fields:
                         if field in device:
-                            df.at[idx, f'device.{field}'] = device[field]
+                            columns[f'device.{field}'][idx] = device[field]
             
             # Extract patient outcomes
             if 'patient' in result and result['patient']:
@@ -163,9 +355,14 @@ class EnhancedFDARetriever:
                     if 'sequence_number_outcome' in patient:
                         outcomes.extend(patient['sequence_number_outcome'])
                 if outcomes:
-                    df.at[idx, 'patient_outcomes'] = '; '.join(outcomes)
-                    
-        return df
+                    outcomes_col[idx] = '; '.join(outcomes)
+        
+        columns['patient_outcomes'] = outcomes_col
+        # Reports without a value keep whatever json_normalize produced, as before
+        for name, values in columns.items():
+            built = pd.Series(values, index=df.index, dtype=object)
+            columns[name] = built.combine_first(df[name]) if name in df.columns else built
+        return df.assign(**columns)
     
     def _standardize_dates(self, df: pd.DataFrame, source: str) -> pd.DataFrame:
         """Standardize date formats across sources."""
@@ -176,12 +373,20 @@ class EnhancedFDARetriever:
             "pma": ["decision_date", "date_received"]
         }
         
-        fields = date_fields.get(source.lower(), [])
-        for field in fields:
-            if field in df.columns:
-                df[field] = pd.to_datetime(df[field], errors='coerce')
-                
-        return df
+        fields = [field for field in date_fields.get(source.lower(), []) if field in df.columns]
+        if not fields:
+            return df
+            
+        # Parse all date columns as one flattened array: the fixed YYYYMMDD format takes pandas'
+        # fast path, and only values it rejects (e.g. ISO recall dates) go through format inference
+        values = pd.Series(df[fields].to_numpy().ravel(order='F'))
+        parsed = pd.to_datetime(values, format='%Y%m%d', errors='coerce')
+        leftover = parsed.isna() & values.notna()
+        if leftover.any():
+            parsed[leftover] = pd.to_datetime(values[leftover], format='mixed', errors='coerce')
+            
+        n = len(df)
+        return df.assign(**{field: parsed.iloc[i * n:(i + 1) * n].to_numpy() for i, field in enumerate(fields)})
     
     def get_cross_referenced_data(self, query: str, lookback_years: int = 3) -> Dict[str, pd.DataFrame]:
         """Get comprehensive cross-referenced data across all sources."""
@@ -191,38 +396,31 @@ class EnhancedFDARetriever:
         # Priority order for data retrieval
         source_priority = ["classification", "udi", "510k", "pma", "recall", "event"]
         
+        # Sources are independent, so fetch them all concurrently and report in priority order
+        logger.info("Retrieving %s data...", ", ".join(source.upper() for source in source_priority))
+        with ThreadPoolExecutor(max_workers=len(source_priority)) as pool:
+            futures = {source: pool.submit(self.get_comprehensive_data, query, source, 500, cutoff_date) for source in source_priority}
+        
         for source in source_priority:
-            print(f"Retrieving {source.upper()} data...")
-            df = self.get_comprehensive_data(query, source, max_records=500)
+            df = futures[source].result()
             
             if not df.empty:
-                # Apply date filtering where appropriate
-                if source in ["recall", "event", "510k", "pma"]:
-                    df = self._filter_by_date(df, source, cutoff_date)
-                    
                 results[source.upper()] = df
-                print(f"Found {len(df)} records in {source.upper()}")
+                logger.info("Found %d records in %s", len(df), source.upper())
             else:
-                print(f"No data found in {source.upper()}")
+                logger.info("No data found in %s", source.upper())
                 
         return results
-    
-    def _filter_by_date(self, df: pd.DataFrame, source: str, cutoff_date: datetime) -> pd.DataFrame:
-        """Filter DataFrame by date with source-specific logic."""
-        date_field_map = {
-            "recall": "event_date_initiated",
-            "event": "date_received", 
-            "510k": "decision_date",
-            "pma": "decision_date"
-        }
-        
-        date_field = date_field_map.get(source.lower())
-        if date_field and date_field in df.columns:
-            return df[df[date_field] >= cutoff_date]
-        return df
 
 
 if __name__ == "__main__":
+    # Worker threads only enqueue records; the listener thread does the formatting and stream I/O
+    log_queue = queue.SimpleQueue()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.handlers.QueueHandler(log_queue)])
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    listener.start()
+    
     # Test the enhanced retrieval
     retriever = EnhancedFDARetriever()
     
@@ -234,4 +432,6 @@ if __name__ == "__main__":
     
     print("\nSummary:")
     for source, df in results.items():
-        print(f"{source}: {len(df)} records")
\ No newline at end of file
+        print(f"{source}: {len(df)} records")
+    
+    listener.stop()
\ No newline at end of file
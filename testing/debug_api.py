@@ -4,8 +4,27 @@ Debug FDA API query syntax issues
 
 import requests
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlencode
 
+MAX_WORKERS = 8
+
+# One keep-alive session shared by every probe, so connections are reused across tests
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS))
+
+def _get(base_url, params):
+    try:
+        return session.get(base_url, params=params, timeout=10)
+    except requests.exceptions.RequestException as e:
+        return e
+
+def fetch_all(base_url, params_list):
+    """Issue independent GETs concurrently; responses (or exceptions) come back in request order."""
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        return list(executor.map(lambda params: _get(base_url, params), params_list))
+
 def test_simple_queries():
     """Test simple working queries to understand proper syntax."""
     
@@ -24,10 +43,12 @@ def test_simple_queries():
     print("Testing FDA API Query Syntax")
     print("=" * 50)
     
-    for test in test_cases:
+    responses = fetch_all(base_url, [{"search": test["search"], "limit": 5} for test in test_cases])
+    
+    for test, response in zip(test_cases, responses):
         try:
-            params = {"search": test["search"], "limit": 5}
-            response = requests.get(base_url, params=params, timeout=10)
+            if isinstance(response, Exception):
+                raise response
             
             print(f"\n{test['description']}:")
             print(f"Query: {test['search']}")
@@ -65,10 +86,12 @@ def test_recall_api():
     print("\n\nTesting Recall API")
     print("=" * 50)
     
-    for test in test_cases:
+    responses = fetch_all(base_url, [{"search": test["search"], "limit": 3} for test in test_cases])
+    
+    for test, response in zip(test_cases, responses):
         try:
-            params = {"search": test["search"], "limit": 3}
-            response = requests.get(base_url, params=params, timeout=10)
+            if isinstance(response, Exception):
+                raise response
             
             print(f"\n{test['description']}:")
             print(f"Status: {response.status_code}")
@@ -102,10 +125,12 @@ def test_working_insulin_pump_search():
     
     base_url = "https://api.fda.gov/device/event.json"
     
-    for search in searches:
+    responses = fetch_all(base_url, [{"search": search, "limit": 1} for search in searches])
+    
+    for search, response in zip(searches, responses):
         try:
-            params = {"search": search, "limit": 1}
-            response = requests.get(base_url, params=params, timeout=10)
+            if isinstance(response, Exception):
+                raise response
             
             if response.status_code == 200:
                 data = response.json()
@@ -9,8 +9,14 @@ from data_retrieval_enhanced import EnhancedFDARetriever
 from data_relationships import DataRelationshipMapper
 from query_intelligence import QueryIntelligence
 from fda_data import get_fda_data
+from _utils import count_records, count_nested_records
 import time
 
+# Shared across every query so the HTTP session, response caches and profile cache carry over
+qi = QueryIntelligence()
+retriever = EnhancedFDARetriever(rate_limit_delay=0.1)
+mapper = DataRelationshipMapper()
+
 def comprehensive_comparison():
     """Comprehensive comparison of original vs enhanced approach."""
     
@@ -31,13 +37,8 @@ def comprehensive_comparison():
         original_data = get_fda_data(query, "device", limit=100, date_months=6)
         original_time = time.time() - start_time
         
-        original_total = 0
-        original_sources = 0
-        for category in original_data.values():
-            for source, df in category.items():
-                if not df.empty:
-                    original_total += len(df)
-                    original_sources += 1
+        original_total = count_nested_records(original_data)
+        original_sources = sum(not df.empty for category in original_data.values() for df in category.values())
         
         print(f"  Records: {original_total}")
         print(f"  Sources with data: {original_sources}")
@@ -48,20 +49,17 @@ def comprehensive_comparison():
         start_time = time.time()
         
         # Query intelligence
-        qi = QueryIntelligence()
         context = qi.analyze_query(query)
         
         # Enhanced retrieval
-        retriever = EnhancedFDARetriever(rate_limit_delay=0.1)
         enhanced_data = retriever.get_cross_referenced_data(query, lookback_years=1)
         
         # Relationship mapping
-        mapper = DataRelationshipMapper()
         profile = mapper.create_comprehensive_profile(enhanced_data, query)
         
         enhanced_time = time.time() - start_time
         
-        enhanced_total = sum(len(df) for df in enhanced_data.values())
+        enhanced_total = count_records(enhanced_data)
         enhanced_sources = len([s for s, df in enhanced_data.items() if not df.empty])
         
         print(f"  Records: {enhanced_total}")
@@ -114,16 +112,14 @@ def demonstrate_ai_enhancement():
     query = "insulin pump"
     
     # Get enhanced data
-    retriever = EnhancedFDARetriever(rate_limit_delay=0.1)
     fda_data = retriever.get_cross_referenced_data(query, lookback_years=1)
     
     # Create device profile
-    mapper = DataRelationshipMapper()
     profile = mapper.create_comprehensive_profile(fda_data, query)
     summary = mapper.generate_regulatory_summary(profile)
     
     print(f"Enhanced Data Foundation:")
-    print(f"  Total records: {sum(len(df) for df in fda_data.values())}")
+    print(f"  Total records: {count_records(fda_data)}")
     print(f"  Risk score: {profile.risk_score}")
     print(f"  Regulatory events: {len(profile.timeline)}")
     print(f"  Class I recalls: {summary['safety_signals']['class_1_recalls']}")
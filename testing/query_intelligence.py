@@ -3,220 +3,298 @@ Intelligent Query Processing and Enhancement
 Transforms user queries into comprehensive FDA search strategies.
 """
 
+import dataclasses
+import functools
 import re
-from typing import List, Dict, Set, Tuple
+from collections import deque
+from typing import Iterator, List, Dict, Set, Tuple
 from dataclasses import dataclass
 
-@dataclass
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    """Lowercase, trim, and collapse internal whitespace runs to single spaces."""
+    return _WHITESPACE_RE.sub(" ", query).strip().lower()
+
+# Fixed indicator words used to classify the query
+COMPANY_INDICATORS = ["inc", "corp", "company", "ltd", "llc", "laboratories", "medical", "systems"]
+DEVICE_INDICATORS = ["device", "pump", "catheter", "implant", "stent", "replacement", "monitor"]
+MEDICAL_INDICATORS = ["diabetes", "heart", "knee", "hip", "eye", "kidney"]
+
+# Common device name variations and synonyms
+DEVICE_SYNONYMS = {
+    "insulin pump": ["insulin infusion pump", "continuous subcutaneous insulin infusion", "CSII"],
+    "pacemaker": ["cardiac pacemaker", "implantable pacemaker", "permanent pacemaker"],
+    "stent": ["coronary stent", "vascular stent", "drug eluting stent", "bare metal stent"],
+    "catheter": ["intravascular catheter", "central venous catheter", "urinary catheter"],
+    "implant": ["medical implant", "surgical implant", "prosthetic implant"],
+    "ventilator": ["mechanical ventilator", "respiratory ventilator", "breathing machine"],
+    "defibrillator": ["implantable defibrillator", "ICD", "automated external defibrillator", "AED"],
+    "hip replacement": ["total hip arthroplasty", "hip prosthesis", "hip implant"],
+    "knee replacement": ["total knee arthroplasty", "knee prosthesis", "knee implant"]
+}
+
+# Common manufacturer variations
+MANUFACTURER_SYNONYMS = {
+    "medtronic": ["medtronic plc", "medtronic inc", "medtronic usa"],
+    "johnson": ["johnson & johnson", "j&j", "ethicon", "depuy"],
+    "abbott": ["abbott laboratories", "abbott medical"],
+    "boston scientific": ["boston scientific corp", "bsc"],
+    "edwards": ["edwards lifesciences", "edwards lifesciences corp"],
+    "stryker": ["stryker corporation", "stryker corp"],
+    "zimmer": ["zimmer biomet", "zimmer holdings"]
+}
+
+# Medical specialty keywords
+MEDICAL_SPECIALTIES = {
+    "cardiology": ["cardiac", "heart", "coronary", "vascular", "cardiovascular"],
+    "orthopedics": ["bone", "joint", "spine", "orthopedic", "musculoskeletal"],
+    "neurology": ["brain", "neural", "neurological", "neurosurgical"],
+    "diabetes": ["diabetic", "glucose", "insulin", "blood sugar"],
+    "respiratory": ["lung", "pulmonary", "breathing", "airway"],
+    "urology": ["kidney", "bladder", "urinary", "renal"],
+    "ophthalmology": ["eye", "ocular", "vision", "retinal"],
+    "gastroenterology": ["digestive", "gastrointestinal", "stomach", "intestinal"]
+}
+
+# Product codes for common devices; this would ideally be the full FDA product code database,
+# which the keyword automaton can absorb without slowing down matching
+PRODUCT_CODES = {
+    "insulin pump": ["LZG", "MKJ"],
+    "pacemaker": ["DXX", "DTC", "DTB"],
+    "stent": ["NIR", "NIT"],
+    "catheter": ["DQO", "FOZ"],
+    "defibrillator": ["MKJ", "MLC"],
+    "hip replacement": ["JDH", "KWP"],
+    "knee replacement": ["KWK", "JDI"]
+}
+
+# Regulatory action keywords
+REGULATORY_KEYWORDS = {
+    "safety": ["recall", "warning", "alert", "adverse", "malfunction", "failure"],
+    "approval": ["clearance", "approved", "authorized", "permitted", "510k", "pma"],
+    "market": ["withdrawn", "discontinued", "suspended", "banned"],
+    "quality": ["inspection", "violation", "deviation", "corrective", "preventive"]
+}
+
+# Search templates per source for generate_fda_search_strategies; each term gets the fixed field
+# searches plus one that depends on whether the query names a manufacturer
+SEARCH_TEMPLATES = {
+    "510k": ('device_name:"{}"', 'device_name:{}*'),
+    "event": ('device.brand_name:"{}"', 'device.generic_name:"{}"'),
+    "recall": ('product_description:"{}"', 'product_description:{}*')
+}
+MANUFACTURER_TEMPLATES = {"510k": 'applicant:"{}"', "event": 'manufacturer_name:"{}"', "recall": 'recalling_firm:"{}"'}
+DEVICE_TEMPLATES = {"510k": 'product_code:{}', "event": 'device.brand_name:{}*', "recall": 'manufacturer_name:{}*'}
+
+@dataclass(slots=True, frozen=True)
 class QueryContext:
     original_query: str
     query_type: str  # "device", "manufacturer", "indication", "mixed"
-    expanded_terms: List[str]
-    product_codes: List[str]
-    regulatory_keywords: List[str]
-    medical_terms: List[str]
+    expanded_terms: Tuple[str, ...]
+    product_codes: Tuple[str, ...]
+    regulatory_keywords: Tuple[str, ...]
+    medical_terms: Tuple[str, ...]
 
-class QueryIntelligence:
+class KeywordAutomaton:
+    """Aho-Corasick automaton: finds every (possibly overlapping) keyword occurrence in one pass.
+    
+    Matching costs O(len(text) + matches) however many keywords are added, and keeps the substring
+    semantics of `keyword in text`.
+    """
+    
     def __init__(self):
-        # Common device name variations and synonyms
-        self.device_synonyms = {
-            "insulin pump": ["insulin infusion pump", "continuous subcutaneous insulin infusion", "CSII"],
-            "pacemaker": ["cardiac pacemaker", "implantable pacemaker", "permanent pacemaker"],
-            "stent": ["coronary stent", "vascular stent", "drug eluting stent", "bare metal stent"],
-            "catheter": ["intravascular catheter", "central venous catheter", "urinary catheter"],
-            "implant": ["medical implant", "surgical implant", "prosthetic implant"],
-            "ventilator": ["mechanical ventilator", "respiratory ventilator", "breathing machine"],
-            "defibrillator": ["implantable defibrillator", "ICD", "automated external defibrillator", "AED"],
-            "hip replacement": ["total hip arthroplasty", "hip prosthesis", "hip implant"],
-            "knee replacement": ["total knee arthroplasty", "knee prosthesis", "knee implant"]
-        }
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]
         
-        # Common manufacturer variations
-        self.manufacturer_synonyms = {
-            "medtronic": ["medtronic plc", "medtronic inc", "medtronic usa"],
-            "johnson": ["johnson & johnson", "j&j", "ethicon", "depuy"],
-            "abbott": ["abbott laboratories", "abbott medical"],
-            "boston scientific": ["boston scientific corp", "bsc"],
-            "edwards": ["edwards lifesciences", "edwards lifesciences corp"],
-            "stryker": ["stryker corporation", "stryker corp"],
-            "zimmer": ["zimmer biomet", "zimmer holdings"]
-        }
+    def add_word(self, word: str, tag: Tuple[str, str]):
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(tag)
         
-        # Medical specialty keywords
-        self.medical_specialties = {
-            "cardiology": ["cardiac", "heart", "coronary", "vascular", "cardiovascular"],
-            "orthopedics": ["bone", "joint", "spine", "orthopedic", "musculoskeletal"],
-            "neurology": ["brain", "neural", "neurological", "neurosurgical"],
-            "diabetes": ["diabetic", "glucose", "insulin", "blood sugar"],
-            "respiratory": ["lung", "pulmonary", "breathing", "airway"],
-            "urology": ["kidney", "bladder", "urinary", "renal"],
-            "ophthalmology": ["eye", "ocular", "vision", "retinal"],
-            "gastroenterology": ["digestive", "gastrointestinal", "stomach", "intestinal"]
-        }
+    def make_automaton(self):
+        """Link failure transitions breadth-first; must be called after the last add_word."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+                
+    def iter(self, text: str) -> Iterator[Tuple[str, str]]:
+        """Yield the tag of every keyword occurrence in text, in order of where each match ends."""
+        node = 0
+        for ch in text:
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            yield from self._out[node]
+
+@functools.lru_cache(maxsize=1)
+def _shared_automaton() -> KeywordAutomaton:
+    """One automaton over every keyword the classifiers look for, tagged with (bucket, key); built once per process."""
+    automaton = KeywordAutomaton()
+    for bucket, words in (("company", COMPANY_INDICATORS), ("device_indicator", DEVICE_INDICATORS),
+                          ("medical_indicator", MEDICAL_INDICATORS)):
+        for word in words:
+            automaton.add_word(word, (bucket, word))
+    for device in DEVICE_SYNONYMS:
+        automaton.add_word(device, ("device", device))
+    for manufacturer in MANUFACTURER_SYNONYMS:
+        automaton.add_word(manufacturer, ("manufacturer", manufacturer))
+    for specialty, terms in MEDICAL_SPECIALTIES.items():
+        for term in terms:
+            automaton.add_word(term, ("specialty", specialty))
+    for device in PRODUCT_CODES:
+        automaton.add_word(device, ("product_code", device))
+    for category, keywords in REGULATORY_KEYWORDS.items():
+        for keyword in keywords:
+            automaton.add_word(keyword, ("regulatory", category))
+    automaton.make_automaton()
+    return automaton
+
+class QueryIntelligence:
+    def __init__(self):
+        # Bind the shared module-level dictionaries; nothing is rebuilt per instance
+        self.device_synonyms = DEVICE_SYNONYMS
+        self.manufacturer_synonyms = MANUFACTURER_SYNONYMS
+        self.medical_specialties = MEDICAL_SPECIALTIES
+        self.regulatory_keywords = REGULATORY_KEYWORDS
+        self._automaton = _shared_automaton()
         
-        # Regulatory action keywords
-        self.regulatory_keywords = {
-            "safety": ["recall", "warning", "alert", "adverse", "malfunction", "failure"],
-            "approval": ["clearance", "approved", "authorized", "permitted", "510k", "pma"],
-            "market": ["withdrawn", "discontinued", "suspended", "banned"],
-            "quality": ["inspection", "violation", "deviation", "corrective", "preventive"]
-        }
+    def _match_keywords(self, query: str) -> Dict[str, List[str]]:
+        """Scan the query once; matched keys per bucket, deduplicated in order of appearance."""
+        found: Dict[str, Dict[str, None]] = {}
+        for bucket, key in self._automaton.iter(query):
+            found.setdefault(bucket, {})[key] = None
+        return {bucket: list(keys) for bucket, keys in found.items()}
         
     def analyze_query(self, query: str) -> QueryContext:
-        """Analyze and classify the user query."""
-        query_lower = query.lower().strip()
+        """Analyze and classify the user query.
+        
+        The analysis depends only on the query and the shared module dictionaries, so it is memoized
+        process-wide across instances, keyed on the normalized query so case and spacing variants
+        share one entry; treat the returned context as read-only.
+        """
+        context = _cached_analysis(normalize_query(query))
+        if context.original_query == query:
+            return context
+        return dataclasses.replace(context, original_query=query)
+        
+    def _analyze(self, query_lower: str) -> QueryContext:
+        """Analyze an already normalized query."""
+        # Every keyword dictionary is matched in a single pass; the classifiers below read the hits
+        matches = self._match_keywords(query_lower)
         
         # Determine query type
-        query_type = self._classify_query_type(query_lower)
+        query_type = self._classify_query_type(matches)
         
         # Generate expanded terms
-        expanded_terms = self._expand_query_terms(query_lower, query_type)
+        expanded_terms = self._expand_query_terms(query_lower, query_type, matches)
         
         # Extract relevant product codes (would need FDA product code database)
-        product_codes = self._extract_product_codes(query_lower)
+        product_codes = self._extract_product_codes(matches)
         
         # Identify regulatory keywords
-        regulatory_keywords = self._identify_regulatory_context(query_lower)
+        regulatory_keywords = self._identify_regulatory_context(matches)
         
         # Extract medical terms
-        medical_terms = self._extract_medical_context(query_lower)
+        medical_terms = self._extract_medical_context(matches)
         
         return QueryContext(
-            original_query=query,
+            original_query=query_lower,
             query_type=query_type,
-            expanded_terms=expanded_terms,
-            product_codes=product_codes,
-            regulatory_keywords=regulatory_keywords,
-            medical_terms=medical_terms
+            expanded_terms=tuple(expanded_terms),
+            product_codes=tuple(product_codes),
+            regulatory_keywords=tuple(regulatory_keywords),
+            medical_terms=tuple(medical_terms)
         )
     
-    def _classify_query_type(self, query: str) -> str:
+    def _classify_query_type(self, matches: Dict[str, List[str]]) -> str:
         """Classify whether query is about device, manufacturer, or mixed."""
         
-        # Company/manufacturer indicators
-        company_indicators = ["inc", "corp", "company", "ltd", "llc", "laboratories", "medical", "systems"]
-        manufacturer_keywords = list(self.manufacturer_synonyms.keys())
-        
         # Check for manufacturer patterns
-        if any(indicator in query for indicator in company_indicators):
-            return "manufacturer"
-        if any(mfg in query for mfg in manufacturer_keywords):
+        if "company" in matches or "manufacturer" in matches:
             return "manufacturer"
             
         # Device indicators
-        device_indicators = ["device", "pump", "catheter", "implant", "stent", "replacement", "monitor"]
-        if any(device in query for device in device_indicators):
+        if "device_indicator" in matches:
             return "device"
             
         # Medical condition indicators (usually device-related)
-        medical_indicators = ["diabetes", "heart", "knee", "hip", "eye", "kidney"]
-        if any(med in query for med in medical_indicators):
+        if "medical_indicator" in matches:
             return "device"
             
         # Default to device if unclear
         return "device"
     
-    def _expand_query_terms(self, query: str, query_type: str) -> List[str]:
+    def _expand_query_terms(self, query: str, query_type: str, matches: Dict[str, List[str]]) -> List[str]:
         """Generate expanded search terms based on query analysis."""
         expanded = [query]
         
         # Add synonyms based on query type
         if query_type in ["device", "mixed"]:
-            for device, synonyms in self.device_synonyms.items():
-                if device in query:
-                    expanded.extend(synonyms)
+            for device in matches.get("device", []):
+                expanded.extend(self.device_synonyms[device])
                     
         if query_type in ["manufacturer", "mixed"]:
-            for manufacturer, variations in self.manufacturer_synonyms.items():
-                if manufacturer in query:
-                    expanded.extend(variations)
+            for manufacturer in matches.get("manufacturer", []):
+                expanded.extend(self.manufacturer_synonyms[manufacturer])
         
         # Add medical specialty variations
-        for specialty, terms in self.medical_specialties.items():
-            if any(term in query for term in terms):
-                expanded.extend(terms)
+        for specialty in matches.get("specialty", []):
+            expanded.extend(self.medical_specialties[specialty])
                 
-        # Remove duplicates and original query
-        expanded = list(set(expanded))
-        if query in expanded:
-            expanded.remove(query)
-            
-        return [query] + expanded[:10]  # Limit to prevent overload
+        # Order-preserving dedup keeps the query first and the synonyms closest to it next
+        return list(dict.fromkeys(expanded))[:11]  # Query plus 10 terms, to prevent overload
     
-    def _extract_product_codes(self, query: str) -> List[str]:
+    def _extract_product_codes(self, matches: Dict[str, List[str]]) -> List[str]:
         """Extract or infer FDA product codes from query."""
-        # This would ideally use a comprehensive FDA product code database
-        # For now, implementing common patterns
-        
-        common_codes = {
-            "insulin pump": ["LZG", "MKJ"],
-            "pacemaker": ["DXX", "DTC", "DTB"],
-            "stent": ["NIR", "NIT"],
-            "catheter": ["DQO", "FOZ"],
-            "defibrillator": ["MKJ", "MLC"],
-            "hip replacement": ["JDH", "KWP"],
-            "knee replacement": ["KWK", "JDI"]
-        }
-        
         codes = []
-        for device, device_codes in common_codes.items():
-            if device in query:
-                codes.extend(device_codes)
+        for device in matches.get("product_code", []):
+            codes.extend(PRODUCT_CODES[device])
                 
         return codes
     
-    def _identify_regulatory_context(self, query: str) -> List[str]:
+    def _identify_regulatory_context(self, matches: Dict[str, List[str]]) -> List[str]:
         """Identify regulatory action context in query."""
-        context = []
-        
-        for category, keywords in self.regulatory_keywords.items():
-            if any(keyword in query for keyword in keywords):
-                context.append(category)
-                
-        return context
+        return matches.get("regulatory", [])
     
-    def _extract_medical_context(self, query: str) -> List[str]:
+    def _extract_medical_context(self, matches: Dict[str, List[str]]) -> List[str]:
         """Extract medical specialty context."""
-        context = []
-        
-        for specialty, terms in self.medical_specialties.items():
-            if any(term in query for term in terms):
-                context.append(specialty)
-                
-        return context
+        return matches.get("specialty", [])
     
-    def generate_fda_search_strategies(self, context: QueryContext) -> Dict[str, List[str]]:
+    def generate_fda_search_strategies(self, context: QueryContext) -> Dict[str, Tuple[str, ...]]:
         """Generate optimized search strategies for each FDA database."""
-        strategies = {}
+        # A fresh dict per caller, so mutating the result can never reach the shared cache entry
+        return dict(self._build_strategies(context))
         
+    @staticmethod
+    @functools.lru_cache(maxsize=512)
+    def _build_strategies(context: QueryContext) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+        """Strategies are a pure function of the (hashable) context, cached as immutable (source, queries) pairs."""
         base_terms = context.expanded_terms[:5]  # Use top 5 expanded terms
+        typed = MANUFACTURER_TEMPLATES if context.query_type == "manufacturer" else DEVICE_TEMPLATES
         
-        # 510K search strategy
-        strategies["510k"] = []
-        for term in base_terms:
-            strategies["510k"].extend([
-                f'device_name:"{term}"',
-                f'device_name:{term}*',
-                f'applicant:"{term}"' if context.query_type == "manufacturer" else f'product_code:{term}'
-            ])
-            
-        # Event search strategy  
-        strategies["event"] = []
-        for term in base_terms:
-            strategies["event"].extend([
-                f'device.brand_name:"{term}"',
-                f'device.generic_name:"{term}"',
-                f'manufacturer_name:"{term}"' if context.query_type == "manufacturer" else f'device.brand_name:{term}*'
-            ])
-            
-        # Recall search strategy
-        strategies["recall"] = []
-        for term in base_terms:
-            strategies["recall"].extend([
-                f'product_description:"{term}"',
-                f'product_description:{term}*',
-                f'recalling_firm:"{term}"' if context.query_type == "manufacturer" else f'manufacturer_name:{term}*'
-            ])
+        # Each source gets its field templates applied to every base term, term by term
+        strategies = {
+            source: [template.format(term) for term in base_terms for template in (*templates, typed[source])]
+            for source, templates in SEARCH_TEMPLATES.items()
+        }
+        strategies["classification"] = []
         
         # Add product code searches if available
         if context.product_codes:
@@ -224,7 +302,12 @@ class QueryIntelligence:
                 strategies["510k"].append(f'product_code:{code}')
                 strategies["classification"].append(f'product_code:{code}')
                 
-        return strategies
+        return tuple((source, tuple(queries)) for source, queries in strategies.items())
+
+
+@functools.lru_cache(maxsize=512)
+def _cached_analysis(normalized_query: str) -> QueryContext:
+    return QueryIntelligence()._analyze(normalized_query)
 
 
 if __name__ == "__main__":
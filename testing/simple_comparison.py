@@ -7,8 +7,24 @@ sys.path.append('..')
 
 from data_retrieval_enhanced import EnhancedFDARetriever
 from fda_data import get_fda_data
+from _utils import count_records, count_nested_records
+from concurrent.futures import ThreadPoolExecutor
 import time
 
+def run_query(query):
+    """Run both approaches for one query, cold and one after the other, returning their data and wall times."""
+    start = time.time()
+    original_data = get_fda_data(query, "device", limit=100, date_months=6, use_cache=False)
+    original_time = time.time() - start
+    
+    # Each worker gets its own retriever, so no query shares a memo, session or rate limiter with another
+    retriever = EnhancedFDARetriever(rate_limit_delay=0.1, use_cache=False)
+    start = time.time()
+    enhanced_data = retriever.get_cross_referenced_data(query, lookback_years=1)
+    enhanced_time = time.time() - start
+    
+    return original_data, original_time, enhanced_data, enhanced_time
+
 def simple_comparison():
     """Simple comparison of data retrieval results."""
     
@@ -17,27 +33,18 @@ def simple_comparison():
     
     queries = ["insulin pump", "pacemaker", "hip replacement"]
     
-    for query in queries:
+    # Queries are network-bound and independent: run them concurrently, then report in order
+    wall_start = time.time()
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        runs = list(pool.map(run_query, queries))
+    wall_time = time.time() - wall_start
+    
+    for query, (original_data, original_time, enhanced_data, enhanced_time) in zip(queries, runs):
         print(f"\nQuery: '{query}'")
         print("-" * 30)
         
-        # Original approach
-        start = time.time()
-        original_data = get_fda_data(query, "device", limit=100, date_months=6)
-        original_time = time.time() - start
-        
-        original_total = 0
-        for category in original_data.values():
-            for source, df in category.items():
-                original_total += len(df)
-        
-        # Enhanced approach  
-        start = time.time()
-        retriever = EnhancedFDARetriever(rate_limit_delay=0.1)
-        enhanced_data = retriever.get_cross_referenced_data(query, lookback_years=1)
-        enhanced_time = time.time() - start
-        
-        enhanced_total = sum(len(df) for df in enhanced_data.values())
+        original_total = count_nested_records(original_data)
+        enhanced_total = count_records(enhanced_data)
         
         print(f"Original: {original_total} records ({original_time:.1f}s)")
         print(f"Enhanced: {enhanced_total} records ({enhanced_time:.1f}s)")
@@ -53,6 +60,8 @@ def simple_comparison():
         for source, df in enhanced_data.items():
             if not df.empty:
                 print(f"  {source}: {len(df)} records")
+    
+    print(f"\nTotal wall time: {wall_time:.1f}s (queries overlapped)")
 
 if __name__ == "__main__":
     simple_comparison()
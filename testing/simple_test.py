@@ -6,7 +6,7 @@ import sys
 sys.path.append('..')
 
 from data_retrieval_enhanced import EnhancedFDARetriever
-import pandas as pd
+from _utils import count_records, count_nested_records
 
 def test_enhanced_retrieval():
     """Test the enhanced retrieval with a simple query."""
@@ -34,16 +34,14 @@ def test_enhanced_retrieval():
                 
                 # Show some sample data
                 if source == "event":
-                    for i, row in df.head(3).iterrows():
-                        device = row.get('device.brand_name', 'N/A')
-                        generic = row.get('device.generic_name', 'N/A')
+                    sample = df.head(3).reindex(columns=['device.brand_name', 'device.generic_name']).fillna('N/A')
+                    for i, (device, generic) in enumerate(sample.itertuples(index=False, name=None)):
                         print(f"    Sample {i+1}: {device} / {generic}")
                         
                 elif source == "recall":
-                    for i, row in df.head(3).iterrows():
-                        product = row.get('product_description', 'N/A')
-                        firm = row.get('recalling_firm', 'N/A')
-                        print(f"    Sample {i+1}: {product[:50]}... / {firm}")
+                    sample = df.head(3).reindex(columns=['product_description', 'recalling_firm']).fillna('N/A')
+                    for i, (product, firm) in enumerate(sample.itertuples(index=False, name=None)):
+                        print(f"    Sample {i+1}: {str(product)[:50]}... / {firm}")
                         
         except Exception as e:
             print(f"  Error: {e}")
@@ -53,7 +51,7 @@ def test_enhanced_retrieval():
     try:
         all_data = retriever.get_cross_referenced_data(query, lookback_years=1)
         
-        total_records = sum(len(df) for df in all_data.values())
+        total_records = count_records(all_data)
         print(f"Total records across all sources: {total_records}")
         
         for source, df in all_data.items():
@@ -80,12 +78,12 @@ def compare_with_original():
         
         # Original approach
         original_data = get_fda_data(query, "device", limit=100, date_months=6)
-        original_total = sum(sum(len(df) for df in category.values()) for category in original_data.values())
+        original_total = count_nested_records(original_data)
         print(f"Original approach: {original_total} records")
         
         # Enhanced approach  
         enhanced_data = test_enhanced_retrieval()
-        enhanced_total = sum(len(df) for df in enhanced_data.values())
+        enhanced_total = count_records(enhanced_data)
         print(f"Enhanced approach: {enhanced_total} records")
         
         if original_total > 0:
@@ -2,14 +2,15 @@
 Test AI integration with enhanced data
 """
 
+import asyncio
+import io
 import sys
 sys.path.append('..')
 
 from data_retrieval_enhanced import EnhancedFDARetriever
 from data_relationships import DataRelationshipMapper
 from query_intelligence import QueryIntelligence
-from llm_utils import run_llm_analysis
-import pandas as pd
+from _utils import count_records
 
 def test_enhanced_ai_pipeline():
     """Test the complete enhanced pipeline with AI analysis."""
@@ -32,7 +33,7 @@ def test_enhanced_ai_pipeline():
     retriever = EnhancedFDARetriever(rate_limit_delay=0.1)
     fda_data = retriever.get_cross_referenced_data(query, lookback_years=1)
     
-    total_records = sum(len(df) for df in fda_data.values())
+    total_records = count_records(fda_data)
     print(f"Total records: {total_records}")
     
     # Step 3: Relationship Mapping
@@ -51,34 +52,18 @@ def test_enhanced_ai_pipeline():
     
     ai_results = {}
     
-    # Analyze each source with substantial data
-    for source, df in fda_data.items():
-        if len(df) >= 10:  # Only analyze sources with enough data
-            print(f"\nAnalyzing {source} ({len(df)} records)...")
-            
-            try:
-                # Use enhanced data preparation
-                sample_size = min(20, len(df))
-                sample_df = df.head(sample_size)
-                
-                # Create custom prompts based on source type
-                custom_prompt = create_enhanced_prompt(sample_df, source, query, profile)
-                
-                analysis = run_llm_analysis(
-                    sample_df, 
-                    source, 
-                    query, 
-                    context.query_type, 
-                    custom_prompt=custom_prompt
-                )
-                
-                ai_results[source] = analysis
-                print(f"✓ {source} analysis completed")
-                print(f"Preview: {analysis[:100]}...")
-                
-            except Exception as e:
-                print(f"✗ {source} analysis failed: {e}")
-                ai_results[source] = f"Analysis failed: {str(e)}"
+    # Analyze each source with substantial data; the LLM calls run concurrently
+    analyses = asyncio.run(_analyze_sources(fda_data, query, context.query_type, profile))
+    for source, analysis in analyses.items():
+        print(f"\nAnalyzing {source} ({len(fda_data[source])} records)...")
+        
+        if isinstance(analysis, Exception):
+            print(f"✗ {source} analysis failed: {analysis}")
+            ai_results[source] = f"Analysis failed: {str(analysis)}"
+        else:
+            ai_results[source] = analysis
+            print(f"✓ {source} analysis completed")
+            print(f"Preview: {analysis[:100]}...")
     
     # Step 5: Generate Comprehensive Summary
     print(f"\nGenerating Comprehensive Summary...")
@@ -94,7 +79,39 @@ def test_enhanced_ai_pipeline():
     
     return profile, ai_results, comprehensive_summary
 
-def create_enhanced_prompt(df, source, query, profile):
+async def _analyze_sources(fda_data, query, query_type, profile):
+    """Analyze every source with enough data concurrently; failures come back as exceptions."""
+    # Imported here so the retrieval steps and their failure paths don't pay for the LLM client stack
+    from llm_utils import run_llm_analysis
+    
+    sources = [source for source, df in fda_data.items() if len(df) >= 10]  # Only analyze sources with enough data
+    prompt_ctx = build_prompt_context(profile)
+    
+    def analyze(source):
+        # Use enhanced data preparation
+        sample_df = fda_data[source].head(20)
+        
+        # Create custom prompts based on source type
+        custom_prompt = create_enhanced_prompt(sample_df, source, query, prompt_ctx)
+        return run_llm_analysis(sample_df, source, query, query_type, custom_prompt=custom_prompt)
+        
+    analyses = await asyncio.gather(*(asyncio.to_thread(analyze, source) for source in sources), return_exceptions=True)
+    return dict(zip(sources, analyses))
+
+def build_prompt_context(profile):
+    """Profile figures the prompts quote, computed once rather than per source prompt."""
+    return {
+        "risk_score": profile.risk_score,
+        "mfrs_top3": list(profile.manufacturers[:3]),
+        "codes_top3": list(profile.product_codes[:3]),
+        "class1_recalls": profile.class_1_recalls,
+        "n_recalls": len(profile.recalls),
+        "n_events": len(profile.adverse_events),
+        "n_clearances": len(profile.clearances),
+        "n_timeline": len(profile.timeline)
+    }
+
+def create_enhanced_prompt(df, source, query, prompt_ctx):
     """Create enhanced prompts based on source type and regulatory context."""
     
     base_context = f"Analyzing {source} data for '{query}' with {len(df)} records"
@@ -104,9 +121,9 @@ def create_enhanced_prompt(df, source, query, profile):
 {base_context}. Focus on recall patterns, classifications, and safety implications.
 
 Device Risk Context:
-- Risk Score: {profile.risk_score}
-- Total Recalls: {len(profile.recalls)}
-- Class I Recalls: {len([r for r in profile.recalls if 'I' in str(r.get('recall_classification', ''))])}
+- Risk Score: {prompt_ctx['risk_score']}
+- Total Recalls: {prompt_ctx['n_recalls']}
+- Class I Recalls: {prompt_ctx['class1_recalls']}
 
 Key Questions:
 1. What are the most serious recall patterns?
@@ -122,9 +139,9 @@ Provide a regulatory-focused analysis with specific risk implications.
 {base_context}. Focus on adverse event patterns and safety signals.
 
 Device Risk Context:
-- Risk Score: {profile.risk_score}
-- Total Adverse Events: {len(profile.adverse_events)}
-- Known Manufacturers: {list(profile.manufacturers)[:3]}
+- Risk Score: {prompt_ctx['risk_score']}
+- Total Adverse Events: {prompt_ctx['n_events']}
+- Known Manufacturers: {prompt_ctx['mfrs_top3']}
 
 Key Questions:
 1. What are the most common adverse events?
@@ -140,9 +157,9 @@ Provide a clinical safety-focused analysis.
 {base_context}. Focus on regulatory approval patterns and predicate devices.
 
 Regulatory Context:
-- Total 510K Clearances: {len(profile.clearances)}
-- Known Product Codes: {list(profile.product_codes)[:3]}
-- Timeline Span: {len(profile.timeline)} events
+- Total 510K Clearances: {prompt_ctx['n_clearances']}
+- Known Product Codes: {prompt_ctx['codes_top3']}
+- Timeline Span: {prompt_ctx['n_timeline']} events
 
 Key Questions:
 1. What types of devices are being cleared?
@@ -162,16 +179,16 @@ Provide a regulatory pathway analysis.
 3. Regulatory implications
 4. Safety considerations
 
-Context: Risk Score {profile.risk_score}, {len(profile.timeline)} regulatory events total.
+Context: Risk Score {prompt_ctx['risk_score']}, {prompt_ctx['n_timeline']} regulatory events total.
 """
 
 def generate_comprehensive_summary(query, profile, summary, ai_results):
     """Generate a comprehensive summary combining all analyses."""
     
-    summary_parts = []
+    buf = io.StringIO()
     
     # Executive Summary
-    summary_parts.append(f"""
+    buf.write(f"""
 ## Executive Summary for '{query}'
 
 **Risk Assessment**: {profile.risk_score}/100 risk score
@@ -182,16 +199,16 @@ def generate_comprehensive_summary(query, profile, summary, ai_results):
     
     # Safety Signals
     if summary['safety_signals']['class_1_recalls'] > 0:
-        summary_parts.append(f"""
+        buf.write(f"""
 ⚠️ **CRITICAL SAFETY ALERT**: {summary['safety_signals']['class_1_recalls']} Class I (life-threatening) recalls identified.
 """)
     
     # AI Analysis Results
-    summary_parts.append("## Detailed Analysis by Data Source\n")
+    buf.write("## Detailed Analysis by Data Source\n")
     
     for source, analysis in ai_results.items():
         if "failed" not in analysis.lower():
-            summary_parts.append(f"""
+            buf.write(f"""
 ### {source} Analysis
 {analysis}
 
@@ -199,25 +216,22 @@ def generate_comprehensive_summary(query, profile, summary, ai_results):
     
     # Recent Activity
     if summary['recent_activity']['last_30_days']:
-        summary_parts.append(f"""
+        buf.write(f"""
 ## Recent Activity (Last 30 Days)
 {len(summary['recent_activity']['last_30_days'])} recent events:
 """)
-        for date, event_type, description in summary['recent_activity']['last_30_days'][:5]:
-            date_str = date.strftime("%Y-%m-%d") if date else "Unknown"
-            summary_parts.append(f"- {date_str}: {description}\n")
+        buf.writelines(f"- {date.strftime('%Y-%m-%d') if date else 'Unknown'}: {description}\n"
+                       for date, event_type, description in summary['recent_activity']['last_30_days'][:5])
     
     # Regulatory Timeline Highlights
     if profile.timeline:
-        summary_parts.append(f"""
+        buf.write(f"""
 ## Key Regulatory Milestones
 Recent timeline highlights:
 """)
-        for date, event_type, description in profile.timeline[-5:]:
-            date_str = date.strftime("%Y-%m-%d") if date else "Unknown"
-            summary_parts.append(f"- {date_str}: {description}\n")
+        buf.writelines(f"- {date_str}: {description}\n" for date_str, event_type, description in profile.recent_timeline(5))
     
-    return ''.join(summary_parts)
+    return buf.getvalue()
 
 if __name__ == "__main__":
     try:
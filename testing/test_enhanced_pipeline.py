@@ -4,16 +4,30 @@ Tests the complete flow from query to comprehensive analysis.
 """
 
 import sys
+import time
 sys.path.append('..')  # Add parent directory to path
 
 from data_retrieval_enhanced import EnhancedFDARetriever
 from query_intelligence import QueryIntelligence
 from data_relationships import DataRelationshipMapper
-import pandas as pd
-from datetime import datetime
+from _utils import count_records, count_nested_records
+from concurrent.futures import ThreadPoolExecutor
 
-def test_complete_pipeline(query: str):
-    """Test the complete enhanced pipeline."""
+LOOKBACK_YEARS = 2
+
+def retrieve(query: str):
+    """Cold retrieval for one query, returning the data and its wall time.
+    
+    Each call builds its own uncached retriever, so concurrent workers never answer from
+    one another's memo and every timing includes the network.
+    """
+    retriever = EnhancedFDARetriever(rate_limit_delay=0.1, use_cache=False)  # Faster for testing
+    start = time.time()
+    fda_data = retriever.get_cross_referenced_data(query, lookback_years=LOOKBACK_YEARS)
+    return fda_data, time.time() - start
+
+def test_complete_pipeline(query: str, retrieved=None):
+    """Test the complete enhanced pipeline; retrieved is an optional (data, seconds) pair from retrieve()."""
     print(f"Testing Enhanced FDA Pipeline for: '{query}'")
     print("=" * 60)
     
@@ -29,13 +43,10 @@ def test_complete_pipeline(query: str):
     
     # Step 2: Enhanced Data Retrieval
     print("\n2. DATA RETRIEVAL")
-    retriever = EnhancedFDARetriever(rate_limit_delay=0.1)  # Faster for testing
+    fda_data, retrieval_time = retrieved if retrieved is not None else retrieve(query)
     
-    # Get comprehensive data
-    fda_data = retriever.get_cross_referenced_data(query, lookback_years=2)
-    
-    total_records = sum(len(df) for df in fda_data.values())
-    print(f"Total Records Retrieved: {total_records}")
+    total_records = count_records(fda_data)
+    print(f"Total Records Retrieved: {total_records} ({retrieval_time:.1f}s)")
     
     for source, df in fda_data.items():
         if not df.empty:
@@ -68,8 +79,7 @@ def test_complete_pipeline(query: str):
         # Show recent timeline
         if profile.timeline:
             print(f"\nRecent Activity (last 5 events):")
-            for date, event_type, description in profile.timeline[-5:]:
-                date_str = date.strftime("%Y-%m-%d") if date else "Unknown"
+            for date_str, event_type, description in profile.recent_timeline(5):
                 print(f"  {date_str}: {event_type} - {description[:80]}...")
     else:
         print("No data available for relationship mapping")
@@ -89,20 +99,16 @@ def compare_with_original():
     
     # Original approach
     print(f"\nOriginal approach for '{test_query}':")
-    original_data = get_fda_data(test_query, "device", limit=100, date_months=6)
+    original_data = get_fda_data(test_query, "device", limit=100, date_months=6, use_cache=False)
     
-    original_total = 0
-    for category in original_data.values():
-        for source, df in category.items():
-            original_total += len(df)
-            
+    original_total = count_nested_records(original_data)
     print(f"Original total records: {original_total}")
     
     # Enhanced approach
     print(f"\nEnhanced approach for '{test_query}':")
     enhanced_data, profile = test_complete_pipeline(test_query)
     
-    enhanced_total = sum(len(df) for df in enhanced_data.values())
+    enhanced_total = count_records(enhanced_data)
     print(f"Enhanced total records: {enhanced_total}")
     
     print(f"\nImprovement: {enhanced_total - original_total} additional records")
@@ -117,13 +123,20 @@ if __name__ == "__main__":
         "pacemaker recall"
     ]
     
-    for query in test_queries:
+    # Queries are network-bound and independent, so retrieve them concurrently, then report in order
+    wall_start = time.time()
+    with ThreadPoolExecutor(max_workers=len(test_queries)) as pool:
+        futures = [pool.submit(retrieve, query) for query in test_queries]
+    wall_time = time.time() - wall_start
+    
+    for query, future in zip(test_queries, futures):
         try:
-            fda_data, profile = test_complete_pipeline(query)
+            fda_data, profile = test_complete_pipeline(query, future.result())
             print("\n" + "-" * 40 + "\n")
         except Exception as e:
             print(f"Error testing '{query}': {e}")
             continue
+    print(f"Total retrieval wall time: {wall_time:.1f}s (queries overlapped)")
     
     # Run comparison
     try:
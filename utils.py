@@ -1,12 +1,18 @@
 import streamlit as st
-from config import DISPLAY_COLUMNS
+from config import DISPLAY_COLUMNS, RAW_DATA_PREVIEW_ROWS
 
 def display_section(title, df, source):
     st.subheader(title)
     cols = DISPLAY_COLUMNS.get(source, [])
     if not df.empty:
         filtered_cols = [col for col in cols if col in df.columns]
-        st.dataframe(df[filtered_cols] if filtered_cols else df)
+        view = df[filtered_cols] if filtered_cols else df
+        if len(view) > RAW_DATA_PREVIEW_ROWS:
+            # Only rows actually sent get serialized to the browser on each rerun
+            if not st.checkbox(f"Show all {len(view)} rows", key=f"show_all_rows_{source}_{title}"):
+                st.caption(f"Showing first {RAW_DATA_PREVIEW_ROWS} of {len(view)} rows.")
+                view = view.head(RAW_DATA_PREVIEW_ROWS)
+        st.dataframe(view, use_container_width=True, height=400)
     else:
         st.info(f"No data found for {title}.")
 